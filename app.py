@@ -2,30 +2,118 @@
 # app.py - Flask API Server for Query Planner
 # ============================================================================
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-import json
+import hashlib
+import os
+import orjson
 import traceback
+from typing import Tuple
 
 try:
-    from data_source import parse_data_to_catalog 
+    from data_source import DataCatalog, parse_data_to_catalog, table_row_count
     from logical_plan import parse_sql, generate_logical_plan
     from optimizer import optimize
     from physical_plan import generate_physical_plan
-    from executor import execute
+    from plan_cache import LRUCache
+    from executor import execute_batch, iter_records, materialize
 except ImportError as e:
     print(f"FATAL ERROR: Failed to import planner modules. Details: {e}")
     exit(1)
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (serializes NumPy values natively)."""
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 
+# Planned queries keyed by SQL text
+_plan_cache = LRUCache(max_size=1024)
+
+# Parsed uploads keyed by (CSV digest, table name). Clients send the same
+# data with every query, so parsing, dictionary encoding and lowercasing
+# run once per upload; catalogs are read-only and shared between requests.
+_catalog_cache = LRUCache(max_size=8)
+
+def load_catalog(csv_data: str, table_name: str) -> Tuple[DataCatalog, bool]:
+    """
+    Returns (data_catalog, cache_hit) for the uploaded CSV, parsing it only
+    when it is not cached yet.
+    """
+    key = (hashlib.blake2b(csv_data.encode()).digest(), table_name)
+    data_catalog = _catalog_cache.get(key)
+    if data_catalog is not None:
+        return data_catalog, True
+    data_catalog = parse_data_to_catalog(csv_data, table_name)
+    _catalog_cache.put(key, data_catalog)
+    return data_catalog, False
+
 def format_plan_tree(plan) -> str:
     """Formats the plan tree for JSON serialization."""
     if hasattr(plan, 'format_tree'):
         return plan.format_tree()
     return str(plan)
 
+def plan_query(sql_query: str) -> dict:
+    """
+    Runs parsing, logical planning, optimization and physical planning for a
+    query, memoized per SQL string. Plans are never mutated after creation,
+    so cached entries are shared between requests.
+    Returns the physical plan and the rendered stage output for the API.
+    """
+    cached = _plan_cache.get(sql_query)
+    if cached is not None:
+        return {**cached, 'cache_hit': True}
+
+    statement = parse_sql(sql_query)
+    logical_plan_initial = generate_logical_plan(statement)
+    opt_output = optimize(logical_plan_initial)
+    physical_plan = generate_physical_plan(opt_output['plan'])
+
+    entry = {
+        'statement': repr(statement),
+        'logical': format_plan_tree(logical_plan_initial),
+        'optimize': format_plan_tree(opt_output['plan']),
+        'message': opt_output['message'],
+        'physical_plan': physical_plan,
+        'physical': format_plan_tree(physical_plan),
+    }
+    _plan_cache.put(sql_query, entry)
+    return {**entry, 'cache_hit': False}
+
+def _read_query_request():
+    """
+    Reads the SQL query, CSV data and table name from the JSON request body.
+    Returns (sql_query, csv_data, table_name, error_response), where
+    error_response is a 400 JSON response for invalid input and None otherwise.
+    """
+    data = request.get_json(silent=True)  # None for a missing or non-JSON body
+    if not isinstance(data, dict):
+        return '', '', '', (jsonify({'error': 'Request body must be a JSON object', 'log': []}), 400)
+    fields = {'sql_query': data.get('sql_query', ''), 'csv_data': data.get('csv_data', ''),
+              'table_name': data.get('table_name', 't1')}
+    for name, value in fields.items():
+        if not isinstance(value, str):
+            return '', '', '', (jsonify({'error': f"'{name}' must be a string", 'log': []}), 400)
+    sql_query = fields['sql_query'].strip()
+    csv_data = fields['csv_data'].strip()
+    table_name = fields['table_name'].strip()
+
+    if not sql_query:
+        return sql_query, csv_data, table_name, (jsonify({'error': 'SQL query is required', 'log': []}), 400)
+    if not csv_data:
+        return sql_query, csv_data, table_name, (jsonify({'error': 'CSV data is required', 'log': []}), 400)
+    return sql_query, csv_data, table_name, None
+
 @app.route('/run_query', methods=['POST'])
 def run_query_api():
     """
@@ -33,16 +121,10 @@ def run_query_api():
     structured results for each stage.
     """
     try:
-        data = request.get_json()
-        sql_query = data.get('sql_query', '').strip()
-        csv_data = data.get('csv_data', '').strip()
-        table_name = data.get('table_name', 't1').strip()
-        
-        if not sql_query:
-            return jsonify({'error': 'SQL query is required', 'log': []}), 400
-        if not csv_data:
-            return jsonify({'error': 'CSV data is required', 'log': []}), 400
-        
+        sql_query, csv_data, table_name, error_response = _read_query_request()
+        if error_response is not None:
+            return error_response
+
         pipeline_results = {
             'log': [],
             'stages': {}
@@ -52,38 +134,37 @@ def run_query_api():
             pipeline_results['log'].append({'stage': stage_name, 'message': message})
 
         # 0. Data Preparation
-        data_catalog = parse_data_to_catalog(csv_data, table_name)
-        row_count = len(data_catalog.get(table_name, []))
-        pipeline_log(f"Data loaded: {row_count} records into table '{table_name}'", 'data')
-        
-        # 1. PARSING (SQL -> AST)
-        statement = parse_sql(sql_query)
-        pipeline_log(f"SQL parsed successfully\nAST: {repr(statement)}", 'parse')
+        data_catalog, catalog_hit = load_catalog(csv_data, table_name)
+        row_count = table_row_count(data_catalog[table_name])
+        cache_note = " (catalog cache hit)" if catalog_hit else ""
+        pipeline_log(f"Data loaded: {row_count} records into table '{table_name}'{cache_note}", 'data')
         
-        # 2. LOGICAL PLAN GENERATION (AST -> Initial Logical Plan)
-        logical_plan_initial = generate_logical_plan(statement)
-        pipeline_results['stages']['logical'] = format_plan_tree(logical_plan_initial)
+        # 1-4. PARSING, LOGICAL PLAN, OPTIMIZATION, PHYSICAL PLAN (memoized per SQL)
+        planned = plan_query(sql_query)
+        cache_note = " (plan cache hit)" if planned['cache_hit'] else ""
+        pipeline_log(f"SQL parsed successfully{cache_note}\nAST: {planned['statement']}", 'parse')
+
+        pipeline_results['stages']['logical'] = planned['logical']
         pipeline_log("Initial Logical Plan generated", 'logical')
-        
-        # 3. OPTIMIZATION (Initial Logical Plan -> Optimized Logical Plan)
-        opt_output = optimize(logical_plan_initial)
-        logical_plan_optimized = opt_output['plan']
-        pipeline_results['stages']['optimize'] = format_plan_tree(logical_plan_optimized)
-        pipeline_log(f"Optimization: {opt_output['message']}", 'optimize')
-
-        # 4. PHYSICAL PLAN GENERATION (Optimized Logical Plan -> Physical Plan)
-        physical_plan = generate_physical_plan(logical_plan_optimized)
-        pipeline_results['stages']['physical'] = format_plan_tree(physical_plan)
+
+        pipeline_results['stages']['optimize'] = planned['optimize']
+        pipeline_log(f"Optimization: {planned['message']}", 'optimize')
+
+        physical_plan = planned['physical_plan']
+        pipeline_results['stages']['physical'] = planned['physical']
         pipeline_log("Physical Plan generated (execution strategy selected)", 'physical')
 
         # 5. EXECUTION (Physical Plan + Data -> Records)
-        final_records = execute(physical_plan, data_catalog)
+        final_records = materialize(execute_batch(physical_plan, data_catalog))
         
         # 6. FINAL RESULT
-        pipeline_results['stages']['execute'] = json.dumps(final_records, indent=2)
+        pipeline_results['stages']['execute'] = orjson.dumps(
+            final_records, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY).decode()
         pipeline_log(f"Execution complete: {len(final_records)} rows returned", 'execute')
 
-        return jsonify(pipeline_results)
+        # Encode once and return the bytes as-is (no second pass through jsonify)
+        return Response(orjson.dumps(pipeline_results, option=OrjsonProvider.option),
+                        mimetype='application/json')
 
     except ValueError as e:
         return jsonify({
@@ -97,6 +178,62 @@ def run_query_api():
             'log': [{'stage': 'error', 'message': f"Internal error: {str(e)}"}]
         }), 500
 
+# Result rows per NDJSON line on the streaming endpoint
+STREAM_BATCH_ROWS = 500
+
+def _ndjson_line(obj) -> bytes:
+    """Encodes one NDJSON line."""
+    return orjson.dumps(obj, option=OrjsonProvider.option) + b'\n'
+
+@app.route('/run_query/stream', methods=['POST'])
+def run_query_stream_api():
+    """
+    Same pipeline as /run_query, streamed as NDJSON: one line per stage as
+    soon as it completes, then the result rows in batches of
+    STREAM_BATCH_ROWS. Errors after streaming has started arrive as a
+    final line with stage 'error'.
+    """
+    sql_query, csv_data, table_name, error_response = _read_query_request()
+    if error_response is not None:
+        return error_response
+
+    def generate():
+        try:
+            data_catalog, catalog_hit = load_catalog(csv_data, table_name)
+            row_count = table_row_count(data_catalog[table_name])
+            cache_note = " (catalog cache hit)" if catalog_hit else ""
+            yield _ndjson_line({'stage': 'data',
+                                'message': f"Data loaded: {row_count} records into table '{table_name}'{cache_note}"})
+
+            planned = plan_query(sql_query)
+            cache_note = " (plan cache hit)" if planned['cache_hit'] else ""
+            yield _ndjson_line({'stage': 'parse',
+                                'message': f"SQL parsed successfully{cache_note}\nAST: {planned['statement']}"})
+            yield _ndjson_line({'stage': 'logical', 'message': "Initial Logical Plan generated",
+                                'plan': planned['logical']})
+            yield _ndjson_line({'stage': 'optimize', 'message': f"Optimization: {planned['message']}",
+                                'plan': planned['optimize']})
+            yield _ndjson_line({'stage': 'physical',
+                                'message': "Physical Plan generated (execution strategy selected)",
+                                'plan': planned['physical']})
+
+            # Result rows become records one batch at a time, right before sending
+            result = execute_batch(planned['physical_plan'], data_catalog)
+            row_count = len(result[1])
+            for records in iter_records(result, STREAM_BATCH_ROWS):
+                yield _ndjson_line({'stage': 'rows', 'rows': records})
+            yield _ndjson_line({'stage': 'execute',
+                                'message': f"Execution complete: {row_count} rows returned"})
+
+        except ValueError as e:
+            yield _ndjson_line({'stage': 'error', 'error': f"Query Error: {str(e)}", 'message': str(e)})
+        except Exception as e:
+            traceback.print_exc()
+            yield _ndjson_line({'stage': 'error', 'error': f"System Error: {str(e)}",
+                                'message': f"Internal error: {str(e)}"})
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -108,7 +245,9 @@ if __name__ == '__main__':
     print("=" * 70)
     print("API Endpoints:")
     print("  - POST /run_query   : Execute SQL query")
+    print("  - POST /run_query/stream : Execute SQL query, streamed as NDJSON")
     print("  - GET  /health      : Health check")
     print("\nServer running at: http://127.0.0.1:5000")
     print("=" * 70)
-    app.run(debug=True, host='127.0.0.1', port=5000)
+    # Development server only; use wsgi.py with gunicorn (see gunicorn.conf.py) in production
+    app.run(debug=os.environ.get('FLASK_ENV') == 'dev', host='127.0.0.1', port=5000)
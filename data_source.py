@@ -2,49 +2,264 @@
 # data_source.py - CSV Data Parser and In-Memory Catalog
 # ============================================================================
 
-from typing import List, Dict, Any, Union
+import csv
+import re
+import sys
+import warnings
+from io import StringIO
+from typing import List, Dict, Any, Optional, Union
+
+import numpy as np
+
+try:
+    import pandas as pd
+except ImportError:  # pandas is optional; the pure-Python parser is used instead
+    pd = None
 
 Record = Dict[str, Union[int, str, float]]
-Table = List[Record]
+Column = np.ndarray
+Columns = Dict[str, Column]
+
+class Table:
+    """
+    A columnar table: `columns` maps column name -> typed array (see
+    to_column). Derived arrays live apart from the columns, so they never
+    clash with user column names:
+    `dictionaries` maps a dictionary-encoded column's name -> its sorted
+    distinct values (see _dictionary_encode);
+    `lowered` maps a text column's name -> its lowercased copy, or the
+    lowercased dictionary for encoded columns (see _add_lowered_columns).
+    """
+    __slots__ = ('columns', 'dictionaries', 'lowered')
+
+    def __init__(self, columns: Optional[Columns] = None,
+                 dictionaries: Optional[Columns] = None,
+                 lowered: Optional[Columns] = None):
+        self.columns = columns if columns is not None else {}
+        self.dictionaries = dictionaries if dictionaries is not None else {}
+        self.lowered = lowered if lowered is not None else {}
+
 DataCatalog = Dict[str, Table]
 
-def parse_data_to_catalog(csv_data: str, table_name: str) -> DataCatalog:
+# Text columns with fewer distinct values than this fraction of rows are encoded
+DICT_ENCODE_MAX_RATIO = 0.5
+
+# Numeric cell shapes, so type inference needs no exception handling
+_INT_RE = re.compile(r'[+-]?\d+')
+_FLOAT_RE = re.compile(r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?')
+_INT64_MIN, _INT64_MAX = int(np.iinfo(np.int64).min), int(np.iinfo(np.int64).max)
+
+def _infer_value(value: str) -> Any:
+    """Infers the Python type of a single CSV cell: int, float, or string."""
+    if _INT_RE.fullmatch(value):
+        number = int(value)
+        # Integers beyond int64 are read as floats, like the numeric columns
+        # that hold them (to_column); JSON encoding has no wider integers
+        return number if _INT64_MIN <= number <= _INT64_MAX else float(value)
+    if _FLOAT_RE.fullmatch(value):
+        return float(value)
+    return sys.intern(value)  # Repeated text values share one object
+
+def to_column(values: List[Any]) -> Column:
+    """
+    Packs a list of cell values into a typed column array.
+    int64 when every cell is an int, float64 when every cell is numeric
+    (empty cells become NaN), otherwise an object array with None for empties.
+    """
+    n = len(values)
+    non_null = [v for v in values if v is not None]
+
+    # Integers beyond int64 fall through to float64, and beyond float64
+    # (hundreds of digits) to an object column, instead of raising
+    if non_null and all(type(v) is int for v in non_null) and len(non_null) == n:
+        try:
+            return np.fromiter(values, dtype=np.int64, count=n)
+        except OverflowError:
+            pass
+    if non_null and all(type(v) in (int, float) for v in non_null):
+        try:
+            return np.fromiter((np.nan if v is None else v for v in values),
+                               dtype=np.float64, count=n)
+        except OverflowError:
+            pass
+
+    column = np.empty(n, dtype=object)
+    column[:] = values
+    return column
+
+def _dictionary_encode(table: Table) -> Table:
+    """
+    Replaces low-cardinality text columns with int32 codes into a sorted
+    dictionary stored in `table.dictionaries` (empty cells get code -1).
+    Mixed text/number columns and high-cardinality columns are left as is.
+    """
+    for name, column in list(table.columns.items()):
+        if column.dtype != object or not len(column):
+            continue
+        present = np.not_equal(column, None)
+        values = column[present]
+        if not all(type(v) is str for v in values.tolist()):
+            continue
+        dictionary, inverse = np.unique(values.astype(str), return_inverse=True)
+        if len(dictionary) >= DICT_ENCODE_MAX_RATIO * len(column):
+            continue
+
+        codes = np.full(len(column), -1, dtype=np.int32)
+        codes[present] = inverse
+        table.columns[name] = codes
+        table.dictionaries[name] = dictionary.astype(object)
+    return table
+
+def _add_lowered_columns(table: Table) -> Table:
+    """
+    Stores a lowercased copy of every text column in `table.lowered`, so
+    case-insensitive string filters compare against it directly instead
+    of lowercasing the column on every query. Empty cells stay None.
+    For dictionary-encoded columns this lowercases the (small) dictionary.
+    """
+    for name, column in (*table.columns.items(), *table.dictionaries.items()):
+        if column.dtype != object:
+            continue
+        present = np.not_equal(column, None)
+        lowered = np.empty(len(column), dtype=object)
+        lowered[present] = np.char.lower(column[present].astype(str))
+        table.lowered[name] = lowered
+    return table
+
+def table_row_count(table: Table) -> int:
+    """Returns the number of rows in a columnar table."""
+    for column in table.columns.values():
+        return len(column)
+    return 0
+
+# read_csv options matching _parse_with_python: split on every comma (no
+# quoting), only empty cells are missing, numbers parse like float()
+_PANDAS_CSV_OPTIONS = dict(keep_default_na=False, na_values=[''], skipinitialspace=True,
+                           quoting=csv.QUOTE_NONE, float_precision='round_trip',
+                           index_col=False, on_bad_lines='skip')
+
+def _is_plain_numeric(series) -> bool:
+    """True when pandas read a column exactly as to_column would build it."""
+    values = series.to_numpy()
+    if values.dtype == np.int64:
+        return True
+    return (values.dtype == np.float64 and not np.isnan(values).all()
+            and not np.isinf(values).any())  # 'inf' is text to _infer_value
+
+def _text_to_column(cells: List[Any]) -> Column:
+    """Builds a column from raw cell text with the per-cell inference rules."""
+    values = []
+    for cell in cells:
+        cell = cell.strip() if isinstance(cell, str) else ''
+        values.append(_infer_value(cell) if cell else None)
+    return to_column(values)
+
+def _drop_malformed_rows(csv_data: str) -> str:
     """
-    Converts CSV-like string data into a DataCatalog of records.
-    Handles type inference: int, float, or string.
+    Returns the CSV text without blank lines and without the rows whose
+    field count differs from the header's, with the same warning as
+    _parse_with_python (pandas would pad short rows and trim long ones).
     """
+    lines = [line for line in csv_data.split('\n') if line.strip()]
+    expected = lines[0].count(',') + 1
+    kept = lines[:1]
+    for i in range(1, len(lines)):
+        n = lines[i].count(',') + 1
+        if n != expected:
+            print(f"Warning: Row {i} has {n} columns, expected {expected}. Skipping.")
+            continue
+        kept.append(lines[i])
+    return '\n'.join(kept)
+
+def _parse_with_pandas(csv_data: str) -> Columns:
+    """
+    Parses CSV text with pandas' C tokenizer and dtype inference.
+    int64/float64 columns are taken as inferred; all other columns (text,
+    mixed, booleans, out-of-range integers) are rebuilt from their stripped
+    text with _infer_value, so the table matches _parse_with_python.
+    """
+    try:
+        with warnings.catch_warnings():  # Malformed rows are reported below
+            warnings.simplefilter('ignore', pd.errors.ParserWarning)
+            df = pd.read_csv(StringIO(csv_data), **_PANDAS_CSV_OPTIONS)
+    except pd.errors.EmptyDataError:
+        raise ValueError("CSV data must contain at least a header row and one data row")
+
+    # Every row has the header's field count exactly when no row was padded
+    # (its last cell would be empty) and the comma total adds up; otherwise
+    # the malformed rows are removed and the text is parsed again
+    last = df.iloc[:, -1]
+    if (last.isna().any() or (last.dtype.kind not in 'iufb' and (last == '').any())
+            or csv_data.count(',') != (len(df.columns) - 1) * (len(df) + 1)):
+        csv_data = _drop_malformed_rows(csv_data)
+        if csv_data.count('\n') != len(df):
+            df = pd.read_csv(StringIO(csv_data), **_PANDAS_CSV_OPTIONS)
+
+    if df.empty:
+        raise ValueError("No valid data rows found in CSV")
+
+    text_names = [name for name in df.columns if not _is_plain_numeric(df[name])]
+    text_df = df
+    if any(pd.api.types.infer_dtype(df[name], skipna=True) != 'string' for name in text_names):
+        # Some inferred values lost their text (e.g. 'TRUE' -> True); re-read those columns as str
+        text_df = pd.read_csv(StringIO(csv_data), dtype=str, usecols=text_names,
+                              **_PANDAS_CSV_OPTIONS)
+
+    # Names come from the raw header line, as in _parse_with_python: pandas
+    # would rename duplicates ('a.1') and empty names ('Unnamed: 2'). A
+    # repeated name keeps its last column.
+    header = next(line for line in csv_data.split('\n') if line.strip())
+    table: Columns = {}
+    for header_name, name in zip((h.strip().lower() for h in header.split(',')), df.columns):
+        if name in text_names:
+            table[header_name] = _text_to_column(text_df[name].tolist())
+        else:
+            table[header_name] = df[name].to_numpy()
+    return table
+
+def _parse_with_python(csv_data: str) -> Columns:
+    """Parses CSV text line by line (used when pandas is not installed)."""
     lines = [line.strip() for line in csv_data.strip().split('\n') if line.strip()]
-    
+
     if len(lines) < 2:
         raise ValueError("CSV data must contain at least a header row and one data row")
 
     headers = [h.strip().lower() for h in lines[0].split(',')]
-    data: Table = []
+    cells: List[List[Any]] = [[] for _ in headers]
 
     for i in range(1, len(lines)):
         values = [v.strip() for v in lines[i].split(',')]
-        
+
         if len(values) != len(headers):
             print(f"Warning: Row {i} has {len(values)} columns, expected {len(headers)}. Skipping.")
             continue
 
-        row: Record = {}
-        for header, value in zip(headers, values):
-            if not value:  # Empty cell
-                row[header] = None
-                continue
-                
-            # Type inference
-            try:
-                row[header] = int(value)
-            except ValueError:
-                try:
-                    row[header] = float(value)
-                except ValueError:
-                    row[header] = value
-        data.append(row)
-        
-    if not data:
+        for column_cells, value in zip(cells, values):
+            # Empty cell -> None
+            column_cells.append(_infer_value(value) if value else None)
+
+    if not cells[0]:
         raise ValueError("No valid data rows found in CSV")
-        
-    return {table_name: data}
+
+    return {header: to_column(column_cells) for header, column_cells in zip(headers, cells)}
+
+def parse_data_to_catalog(csv_data: str, table_name: str) -> DataCatalog:
+    """
+    Converts CSV-like string data into a columnar DataCatalog.
+    Each table maps column name -> typed NumPy array (see to_column).
+    Low-cardinality text columns are dictionary-encoded and text columns
+    get lowercased copies (see Table); callers keep catalogs they query
+    more than once, so that work is done once per table.
+    """
+    if pd is not None:
+        columns = _parse_with_pandas(csv_data)
+    else:
+        columns = _parse_with_python(csv_data)
+    table = _add_lowered_columns(_dictionary_encode(Table(columns)))
+
+    # Scans hand these arrays to operators without copying; make any
+    # accidental in-place write fail loudly instead of corrupting the table
+    for column in (*table.columns.values(), *table.dictionaries.values(),
+                   *table.lowered.values()):
+        column.flags.writeable = False
+    return {table_name: table}
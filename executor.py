@@ -2,20 +2,56 @@
 # executor.py - Query Execution Engine
 # ============================================================================
 
-from typing import List, Dict, Any, Tuple, Union
+import math
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import List, Dict, Any, Iterator, Sequence, Tuple, Optional
+
+import numpy as np
+
+from logical_plan import ArithProj, FilterCondition, Op, ProjectionField
 from physical_plan import PhysicalPlan
+from data_source import Columns, DataCatalog, Table, to_column, table_row_count
+from executor_jit import FILTER_THREADS, PARALLEL_MIN_ROWS, filter_indices
+
+Batch = Tuple[Table, np.ndarray]  # (table, indices of the selected rows)
+
+def _take(column: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """
+    Gathers the selected rows of a column.
+    Row selections are always sorted and duplicate-free, so a selection as
+    long as the column is the whole column and needs no copy.
+    """
+    return column if len(rows) == len(column) else column[rows]
+
+def _take_values(table: Table, name: str, rows: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Gathers the selected rows of a column as plain values, decoding
+    dictionary-encoded text columns. Returns None for unknown columns.
+    """
+    column = table.columns.get(name)
+    if column is None:
+        return None
+    dictionary = table.dictionaries.get(name)
+    if dictionary is None:
+        return _take(column, rows)
+    # Code -1 (empty cell) picks the trailing None
+    return np.append(dictionary, None)[_take(column, rows)]
 
-def _check_condition(record: Dict[str, Any], condition: Tuple[str, str, Any]) -> bool:
+def _is_null(value: Any) -> bool:
+    """True for empty cells: None, or NaN in a float column."""
+    return value is None or (isinstance(value, float) and value != value)
+
+def _check_value(record_val: Any, condition: FilterCondition) -> bool:
     """
-    Evaluates a WHERE condition against a record.
+    Evaluates a WHERE condition against a single cell value.
     Handles type-safe comparisons (numeric vs string).
     """
-    op, col, predicate_val = condition
-    record_val = record.get(col)
-    
-    if record_val is None:
+    op, predicate_val = condition.op, condition.value
+
+    if _is_null(record_val):
         return False
-    
+
     # Determine comparison type
     is_numeric = isinstance(predicate_val, (int, float))
 
@@ -23,10 +59,10 @@ def _check_condition(record: Dict[str, Any], condition: Tuple[str, str, Any]) ->
         # Numeric comparison
         try:
             actual_val = float(record_val)
-            pred_val = float(predicate_val)
-        except (ValueError, TypeError):
+            pred_val = _as_float(predicate_val)
+        except (ValueError, TypeError, OverflowError):
             return False  # Cannot convert to number
-        
+
         if op in ('<', 'LT'):
             return actual_val < pred_val
         elif op in ('>', 'GT'):
@@ -43,88 +79,290 @@ def _check_condition(record: Dict[str, Any], condition: Tuple[str, str, Any]) ->
         # String comparison (case-insensitive)
         actual_str = str(record_val).lower()
         pred_str = str(predicate_val).lower()
-        
+
         if op in ('=', '==', 'EQ'):
             return actual_str == pred_str
         elif op in ('!=', '<>', 'NE'):
             return actual_str != pred_str
-        
+
     return False
 
-def _evaluate_projection(record: Dict[str, Any], 
-                         fields: List[Union[str, Tuple[str, str, Union[int, float]]]]) -> Dict[str, Any]:
-    """
-    Evaluates the SELECT list, including arithmetic expressions.
-    """
-    new_record: Dict[str, Any] = {}
-    
-    for field in fields:
-        if isinstance(field, tuple):
-            # Arithmetic expression: (op, col, value)
-            op, col, val = field
-            record_val = record.get(col)
-            
-            # Generate output column name
-            op_name = {'+': 'plus', '-': 'minus', '*': 'times', '/': 'div'}.get(op, op)
-            output_col = f"{col}_{op_name}_{val}".replace('.', '_')
-
-            if record_val is not None:
-                try:
-                    numeric_val = float(record_val)
-                    
-                    if op == '+':
-                        new_record[output_col] = numeric_val + val
-                    elif op == '-':
-                        new_record[output_col] = numeric_val - val
-                    elif op == '*':
-                        new_record[output_col] = numeric_val * val
-                    elif op == '/':
-                        new_record[output_col] = numeric_val / val if val != 0 else None
-                    else:
-                        new_record[output_col] = None
-                except (ValueError, TypeError):
-                    new_record[output_col] = None
-            else:
-                new_record[output_col] = None
+def _as_float(value: Any) -> float:
+    """
+    A numeric predicate as float64, like the per-value float() comparison;
+    integers too large for float64 become +/-inf instead of raising.
+    """
+    try:
+        return float(value)
+    except OverflowError:
+        return math.inf if value > 0 else -math.inf
+
+# Vectorized comparisons for numeric columns (NaN never matches). Both sides
+# are float64 (see _check_condition), so int64 columns cannot wrap around.
+_NUMERIC_COMPARATORS = {
+    '<': np.less, 'LT': np.less,
+    '>': np.greater, 'GT': np.greater,
+    '<=': np.less_equal, 'LE': np.less_equal,
+    '>=': np.greater_equal, 'GE': np.greater_equal,
+    '=': lambda a, v: np.abs(a - v) < 1e-9,  # Floating point equality
+    '==': lambda a, v: np.abs(a - v) < 1e-9,
+    'EQ': lambda a, v: np.abs(a - v) < 1e-9,
+    '!=': lambda a, v: np.abs(a - v) >= 1e-9,
+    '<>': lambda a, v: np.abs(a - v) >= 1e-9,
+    'NE': lambda a, v: np.abs(a - v) >= 1e-9,
+}
+
+_EQ_OPS = ('=', '==', 'EQ')
+_NE_OPS = ('!=', '<>', 'NE')
+
+def _check_condition(table: Table, rows: np.ndarray,
+                     condition: FilterCondition) -> np.ndarray:
+    """
+    Evaluates a WHERE condition over the selected rows of a column.
+    Returns a boolean mask aligned with `rows`.
+    Numeric and string columns are compared with one NumPy call; mixed
+    column/predicate types fall back to the per-value `_check_value`.
+    """
+    op, col, predicate_val = condition.op, condition.col, condition.value
+    column = table.columns.get(col)
+    if column is None:
+        return np.zeros(len(rows), dtype=bool)  # Unknown column never matches
+
+    dictionary = table.dictionaries.get(col)
+    if dictionary is not None:
+        # Dictionary-encoded: evaluate once per distinct value, then match codes
+        entries = Table({col: dictionary})
+        lowered = table.lowered.get(col)  # The lowercased dictionary
+        if lowered is not None:
+            entries.lowered[col] = lowered
+        matching_codes = np.flatnonzero(_check_condition(entries, np.arange(len(dictionary)), condition))
+        return np.isin(_take(column, rows), matching_codes)
+
+    values = _take(column, rows)
+    is_numeric = isinstance(predicate_val, (int, float))
+
+    if is_numeric and values.dtype.kind in 'iuf':
+        compare = _NUMERIC_COMPARATORS.get(op)
+        if compare is None:
+            return np.zeros(len(rows), dtype=bool)
+        return compare(values.astype(np.float64, copy=False), _as_float(predicate_val))
+
+    if not is_numeric and values.dtype == object:
+        # String comparison (case-insensitive), nulls never match
+        if op not in _EQ_OPS and op not in _NE_OPS:
+            return np.zeros(len(rows), dtype=bool)
+        lowered = table.lowered.get(col)
+        if lowered is not None:
+            lowered = _take(lowered, rows)  # Lowercased at ingest (persistent catalogs)
         else:
+            lowered = np.char.lower(values.astype(str))
+        not_null = np.not_equal(values, None)
+        matches = lowered == str(predicate_val).lower()
+        return not_null & (matches if op in _EQ_OPS else ~matches)
+
+    return np.fromiter((_check_value(v, condition) for v in values.tolist()),
+                       dtype=bool, count=len(rows))
+
+# Shared by all request threads of the process, so concurrent filters
+# queue for FILTER_THREADS workers instead of each starting their own
+_filter_pool: Optional[ThreadPoolExecutor] = None
+_filter_pool_lock = Lock()
+
+def _parallel_filter(table: Table, rows: np.ndarray,
+                     condition: FilterCondition) -> np.ndarray:
+    """
+    Filters row chunks on a thread pool and concatenates the survivors in
+    order. NumPy releases the GIL inside numeric comparisons, so the
+    chunks run on separate cores.
+    """
+    global _filter_pool
+    if _filter_pool is None:
+        with _filter_pool_lock:
+            if _filter_pool is None:
+                _filter_pool = ThreadPoolExecutor(max_workers=FILTER_THREADS)
+    chunks = np.array_split(rows, FILTER_THREADS)
+    matched = _filter_pool.map(lambda chunk: chunk[_check_condition(table, chunk, condition)], chunks)
+    return np.concatenate(list(matched))
+
+def _filter_rows(table: Table, rows: np.ndarray,
+                 condition: FilterCondition) -> np.ndarray:
+    """
+    Returns the subset of `rows` that satisfy a WHERE condition.
+    Large numeric filters use the compiled kernels from executor_jit when
+    Numba is installed, or NumPy on a thread pool otherwise; everything
+    else goes through _check_condition.
+    """
+    op, col, predicate_val = condition.op, condition.col, condition.value
+    column = table.columns.get(col)
+    if (column is not None and isinstance(predicate_val, (int, float))
+            and col not in table.dictionaries and column.dtype.kind in 'iuf'):
+        matched = filter_indices(column, rows, op, _as_float(predicate_val))
+        if matched is not None:
+            return matched
+        if len(rows) >= PARALLEL_MIN_ROWS:
+            return _parallel_filter(table, rows, condition)
+    return rows[_check_condition(table, rows, condition)]
+
+_ARITHMETIC_UFUNCS = {'+': np.add, '-': np.subtract, '*': np.multiply, '/': np.true_divide}
+_ARITHMETIC_NAMES = {'+': 'plus', '-': 'minus', '*': 'times', '/': 'div'}
+
+def _output_name(field: ProjectionField) -> str:
+    """Returns the result column name for a SELECT list entry."""
+    if isinstance(field, ArithProj):
+        return f"{field.col}_{_ARITHMETIC_NAMES.get(field.op, field.op)}_{field.const}".replace('.', '_')
+    return field
+
+def _to_float(value: Any) -> Optional[float]:
+    """Converts a cell of a text/mixed column to float, or None."""
+    if _is_null(value):
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+def _evaluate_projection(table: Table, rows: np.ndarray,
+                         fields: Sequence[ProjectionField]) -> Table:
+    """
+    Evaluates the SELECT list over the selected rows, including arithmetic
+    expressions. Returns the output columns as a new table.
+    Arithmetic on a numeric column is one NumPy ufunc call; empty cells
+    (NaN) stay empty, and division by zero yields an all-empty column.
+    """
+    new_columns: Columns = {}
+    names = [_output_name(field) for field in fields]
+
+    for field, output_col in zip(fields, names):
+        is_arithmetic = isinstance(field, ArithProj)
+        values = _take_values(table, field.col if is_arithmetic else field, rows)
+        if values is None:
+            new_columns[output_col] = to_column([None] * len(rows))
+            continue
+
+        if not is_arithmetic:
             # Simple column selection
-            new_record[field] = record.get(field)
-            
-    return new_record
-
-def execute(physical_plan: PhysicalPlan, data_catalog: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
-    """
-    Recursively executes the physical plan tree.
-    Returns the final result set.
-    """
-    
-    def execute_node(p_plan: PhysicalPlan) -> List[Dict[str, Any]]:
-        
-        # Base case: Sequential Scan
-        if p_plan.operation == 'SequentialScan':
-            table_name = p_plan.kwargs.get('table', 'unknown')
-            return list(data_catalog.get(table_name, []))  # Copy to avoid mutation
-
-        # Recursive case: Get input from child
-        input_data = execute_node(p_plan.child) if p_plan.child else []
-        
-        # Apply operator
-        if p_plan.operation == 'FilterIterative':
-            condition = p_plan.kwargs.get('condition')
-            if condition:
-                return [rec for rec in input_data if _check_condition(rec, condition)]
-            return input_data
-
-        elif p_plan.operation == 'LimitRows':
-            count = p_plan.kwargs.get('count')
-            if count is not None:
-                return input_data[:count]
-            return input_data
-
-        elif p_plan.operation == 'ProjectEvaluate':
-            fields = p_plan.kwargs.get('fields', [])
-            return [_evaluate_projection(rec, fields) for rec in input_data]
-
-        return input_data
-
-    return execute_node(physical_plan)
\ No newline at end of file
+            new_columns[output_col] = values
+            continue
+
+        # Arithmetic expression: col op const
+        op, val = field.op, field.const
+        ufunc = _ARITHMETIC_UFUNCS.get(op)
+        if ufunc is None or (op == '/' and val == 0):
+            new_columns[output_col] = to_column([None] * len(rows))
+            continue
+
+        if values.dtype.kind not in 'iuf':
+            values = to_column([_to_float(v) for v in values.tolist()])
+            if values.dtype.kind not in 'iuf':  # No numeric cells at all
+                new_columns[output_col] = to_column([None] * len(rows))
+                continue
+        new_columns[output_col] = ufunc(values.astype(np.float64, copy=False), val)
+
+    return Table(new_columns)
+
+def _materialize(table: Table, rows: np.ndarray) -> List[Dict[str, Any]]:
+    """Converts the selected rows of a columnar batch into a list of records."""
+    names = list(table.columns)
+    values = []
+    for name in names:
+        cells = _take_values(table, name, rows).tolist()
+        values.append([None if _is_null(v) else v for v in cells])
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+def _match_fused_pipeline(p_plan: PhysicalPlan) -> Optional[Dict[str, Any]]:
+    """
+    Recognizes the common linear plan shape
+        SequentialScan -> [FilterIterative] -> ProjectEvaluate / LimitRows
+    (Project and Limit in either order, since projection is row-by-row).
+    Returns the scan/filter/project/limit arguments, or None for any other shape.
+    """
+    pipeline = p_plan.pipeline  # Execution order: scan first
+    ops = [n.operation for n in pipeline]
+
+    if not ops or ops[0] != Op.SEQUENTIAL_SCAN or ops.count(Op.PROJECT_EVALUATE) != 1:
+        return None
+    rest = ops[1:]
+    if Op.FILTER_ITERATIVE in rest:
+        if rest.count(Op.FILTER_ITERATIVE) != 1 or rest[0] != Op.FILTER_ITERATIVE:
+            return None  # Filter above Project/Limit changes the result
+        rest = rest[1:]
+    if rest.count(Op.LIMIT_ROWS) > 1 or any(op not in (Op.PROJECT_EVALUATE, Op.LIMIT_ROWS) for op in rest):
+        return None
+
+    by_op = {n.operation: n for n in pipeline}
+    return {
+        'table': by_op[Op.SEQUENTIAL_SCAN].table,
+        'condition': by_op[Op.FILTER_ITERATIVE].condition if Op.FILTER_ITERATIVE in by_op else None,
+        'fields': by_op[Op.PROJECT_EVALUATE].fields or (),
+        'count': by_op[Op.LIMIT_ROWS].count if Op.LIMIT_ROWS in by_op else None,
+    }
+
+def _fused_filter_project_limit(table: Table, condition: Optional[FilterCondition],
+                                fields: Sequence[Any], count: Optional[int]) -> Batch:
+    """
+    Runs Filter -> Limit -> Project in a single pass over a table:
+    the filter mask is cut to the first `count` matches before any
+    projection work is done, and no intermediate batches are built.
+    """
+    rows = np.arange(table_row_count(table))
+    if condition:
+        rows = _filter_rows(table, rows, condition)
+    if count is not None:
+        rows = rows[:count]
+    return _evaluate_projection(table, rows, fields), np.arange(len(rows))
+
+def execute(physical_plan: PhysicalPlan, data_catalog: DataCatalog) -> List[Dict[str, Any]]:
+    """
+    Executes the physical plan and returns the result set as records.
+    See execute_batch; rows are materialized into records only once, here.
+    """
+    return materialize(execute_batch(physical_plan, data_catalog))
+
+def materialize(batch: Batch) -> List[Dict[str, Any]]:
+    """Converts a whole columnar result (see execute_batch) into records."""
+    return _materialize(*batch)
+
+def iter_records(batch: Batch, batch_rows: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Materializes a columnar result `batch_rows` records at a time, so a
+    streaming caller never holds the whole result set as records.
+    """
+    table, rows = batch
+    for start in range(0, len(rows), batch_rows):
+        yield _materialize(table, rows[start:start + batch_rows])
+
+def execute_batch(physical_plan: PhysicalPlan, data_catalog: DataCatalog) -> Batch:
+    """
+    Executes the physical plan, one operator after another along its
+    pipeline (see PhysicalPlan.pipeline), and returns the result as a
+    columnar batch. Scan/Filter/Project/Limit chains take the fused
+    single-pass path instead.
+    """
+    fused = _match_fused_pipeline(physical_plan)
+    if fused is not None:
+        table = data_catalog.get(fused['table'], Table())
+        return _fused_filter_project_limit(table, fused['condition'],
+                                           fused['fields'], fused['count'])
+
+    # Run the operators in execution order over one batch
+    table, rows = Table(), np.arange(0)
+    for p_plan in physical_plan.pipeline:
+        if p_plan.operation == Op.SEQUENTIAL_SCAN:
+            table = data_catalog.get(p_plan.table, Table())
+            # No copy: operators never write to their input columns, they
+            # only build new row selections and new output arrays
+            rows = np.arange(table_row_count(table))
+
+        elif p_plan.operation == Op.FILTER_ITERATIVE:
+            if p_plan.condition:
+                rows = _filter_rows(table, rows, p_plan.condition)
+
+        elif p_plan.operation == Op.LIMIT_ROWS:
+            if p_plan.count is not None:
+                rows = rows[:p_plan.count]
+
+        elif p_plan.operation == Op.PROJECT_EVALUATE:
+            table = _evaluate_projection(table, rows, p_plan.fields or ())
+            rows = np.arange(len(rows))
+
+    return table, rows
\ No newline at end of file
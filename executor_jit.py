@@ -0,0 +1,198 @@
+# ============================================================================
+# executor_jit.py - Numba-Compiled Filter Kernels
+# ============================================================================
+
+import os
+from threading import Lock
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    from numba import get_num_threads, njit, prange
+except ImportError:  # Numba is optional; the executor falls back to NumPy
+    njit = None
+
+# Serializes calls into the parallel kernel. Numba's default workqueue
+# threading layer aborts the process when two threads launch parallel
+# regions at once, which threaded servers (gthread, Flask dev) would do.
+_PARALLEL_LOCK = Lock()
+
+# Below this many rows the NumPy path is as fast as the compiled kernels
+JIT_MIN_ROWS = 10_000
+# From this many rows on, filters are split into chunks scanned in parallel
+PARALLEL_MIN_ROWS = 1_000_000
+# Most threads one parallel filter uses. Kept small and fixed: servers run
+# one process per core with several request threads each, so a filter
+# sized to the whole machine would oversubscribe it.
+FILTER_THREADS = min(4, os.cpu_count() or 1)
+
+if njit is not None:
+
+    # Each kernel scans the selected rows of a numeric column in one pass and
+    # returns the matching row indices (no boolean-mask temporary).
+    # NaN never matches, same as the NumPy comparisons.
+
+    @njit(cache=True)
+    def _filter_lt(values, rows, k):
+        out = np.empty(rows.size, dtype=np.int64)
+        n = 0
+        for i in range(rows.size):
+            if values[rows[i]] < k:
+                out[n] = rows[i]
+                n += 1
+        return out[:n]
+
+    @njit(cache=True)
+    def _filter_gt(values, rows, k):
+        out = np.empty(rows.size, dtype=np.int64)
+        n = 0
+        for i in range(rows.size):
+            if values[rows[i]] > k:
+                out[n] = rows[i]
+                n += 1
+        return out[:n]
+
+    @njit(cache=True)
+    def _filter_le(values, rows, k):
+        out = np.empty(rows.size, dtype=np.int64)
+        n = 0
+        for i in range(rows.size):
+            if values[rows[i]] <= k:
+                out[n] = rows[i]
+                n += 1
+        return out[:n]
+
+    @njit(cache=True)
+    def _filter_ge(values, rows, k):
+        out = np.empty(rows.size, dtype=np.int64)
+        n = 0
+        for i in range(rows.size):
+            if values[rows[i]] >= k:
+                out[n] = rows[i]
+                n += 1
+        return out[:n]
+
+    @njit(cache=True)
+    def _filter_eq(values, rows, k):
+        out = np.empty(rows.size, dtype=np.int64)
+        n = 0
+        for i in range(rows.size):
+            if abs(values[rows[i]] - k) < 1e-9:  # Floating point equality
+                out[n] = rows[i]
+                n += 1
+        return out[:n]
+
+    @njit(cache=True)
+    def _filter_ne(values, rows, k):
+        out = np.empty(rows.size, dtype=np.int64)
+        n = 0
+        for i in range(rows.size):
+            if abs(values[rows[i]] - k) >= 1e-9:
+                out[n] = rows[i]
+                n += 1
+        return out[:n]
+
+    @njit(cache=True)
+    def _compare(value, k, op_code):
+        if op_code == 0:
+            return value < k
+        if op_code == 1:
+            return value > k
+        if op_code == 2:
+            return value <= k
+        if op_code == 3:
+            return value >= k
+        if op_code == 4:
+            return abs(value - k) < 1e-9
+        return abs(value - k) >= 1e-9
+
+    @njit(parallel=True, cache=True)
+    def _filter_parallel(values, rows, k, op_code, n_chunks):
+        # Each chunk of `rows` owns the same slice of `slabs` for its matches;
+        # the per-chunk results are then packed together in order.
+        chunk = (rows.size + n_chunks - 1) // n_chunks
+        slabs = np.empty(rows.size, dtype=np.int64)
+        counts = np.zeros(n_chunks, dtype=np.int64)
+        for c in prange(n_chunks):
+            start = c * chunk
+            stop = min(start + chunk, rows.size)
+            n = 0
+            for i in range(start, stop):
+                if _compare(values[rows[i]], k, op_code):
+                    slabs[start + n] = rows[i]
+                    n += 1
+            counts[c] = n
+
+        out = np.empty(counts.sum(), dtype=np.int64)
+        pos = 0
+        for c in range(n_chunks):
+            out[pos:pos + counts[c]] = slabs[c * chunk:c * chunk + counts[c]]
+            pos += counts[c]
+        return out
+
+    _OP_KERNELS: Dict[str, Callable] = {
+        '<': _filter_lt, 'LT': _filter_lt,
+        '>': _filter_gt, 'GT': _filter_gt,
+        '<=': _filter_le, 'LE': _filter_le,
+        '>=': _filter_ge, 'GE': _filter_ge,
+        '=': _filter_eq, '==': _filter_eq, 'EQ': _filter_eq,
+        '!=': _filter_ne, '<>': _filter_ne, 'NE': _filter_ne,
+    }
+
+    # Operator -> op_code understood by _compare
+    _OP_CODES: Dict[str, int] = {
+        '<': 0, 'LT': 0, '>': 1, 'GT': 1, '<=': 2, 'LE': 2,
+        '>=': 3, 'GE': 3, '=': 4, '==': 4, 'EQ': 4, '!=': 5, '<>': 5, 'NE': 5,
+    }
+
+else:
+    _OP_KERNELS = {}
+    _OP_CODES = {}
+
+# Kernels already resolved for an (op, column dtype) pair
+_KERNEL_CACHE: Dict[Tuple[str, str], Optional[Callable]] = {}
+
+def _kernel_for(op: str, dtype: np.dtype) -> Optional[Callable]:
+    """Looks up (and caches) the compiled kernel for an operator and column dtype."""
+    key = (op, dtype.str)
+    if key not in _KERNEL_CACHE:
+        _KERNEL_CACHE[key] = _OP_KERNELS.get(op) if dtype.kind in 'iuf' else None
+    return _KERNEL_CACHE[key]
+
+def warm_up() -> None:
+    """
+    Compiles (or loads from the on-disk cache) every kernel for int64 and
+    float64 columns, so the first large query doesn't pay for it.
+    """
+    rows = np.arange(1, dtype=np.int64)
+    for dtype in (np.int64, np.float64):
+        # Catalog columns are read-only, which Numba types apart from the
+        # writable arrays that projections produce; compile for both
+        read_only = np.zeros(1, dtype=dtype)
+        read_only.flags.writeable = False
+        for column in (read_only, np.zeros(1, dtype=dtype)):
+            for kernel in set(_OP_KERNELS.values()):
+                kernel(column, rows, 0.0)
+            if _OP_CODES:
+                _filter_parallel(column, rows, 0.0, 0, 1)
+
+def filter_indices(column: np.ndarray, rows: np.ndarray, op: str,
+                   predicate_val: float) -> Optional[np.ndarray]:
+    """
+    Runs a numeric comparison over the selected rows of a column with a
+    compiled kernel (split across cores from PARALLEL_MIN_ROWS rows on).
+    Returns the matching row indices, or None when Numba is unavailable,
+    the input is too small, or no kernel fits.
+    """
+    if len(rows) < JIT_MIN_ROWS:
+        return None
+    kernel = _kernel_for(op, column.dtype)
+    if kernel is None:
+        return None
+    rows = rows.astype(np.int64, copy=False)
+    if len(rows) >= PARALLEL_MIN_ROWS:
+        with _PARALLEL_LOCK:
+            return _filter_parallel(column, rows, float(predicate_val), _OP_CODES[op],
+                                    min(FILTER_THREADS, get_num_threads()))
+    return kernel(column, rows, float(predicate_val))
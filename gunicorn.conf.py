@@ -0,0 +1,21 @@
+# ============================================================================
+# gunicorn.conf.py - Gunicorn Settings for the Query Planner API
+# ============================================================================
+# Usage: gunicorn -c gunicorn.conf.py wsgi:app
+
+import multiprocessing
+
+bind = '127.0.0.1:5000'
+
+# One worker process per core. gthread suits CSV uploads (I/O-bound);
+# for CPU-bound query workloads run with `-k sync` instead.
+# Large filters run on at most executor_jit.FILTER_THREADS threads shared
+# by the whole process, not one pool per request thread.
+workers = multiprocessing.cpu_count()
+worker_class = 'gthread'
+threads = 4
+
+def post_worker_init(worker):
+    """Compiles the Numba filter kernels once per worker before it serves requests."""
+    from executor_jit import warm_up
+    warm_up()
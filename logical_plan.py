@@ -2,121 +2,335 @@
 # logical_plan.py - SQL Parser and Logical Plan Generator
 # ============================================================================
 
-import re
-from typing import List, Tuple, Union, Dict, Any, Optional
+import sys
+from dataclasses import dataclass
+from enum import IntEnum
+from functools import lru_cache
+from typing import List, Tuple, Union, Dict, Any, Optional, FrozenSet, Sequence
 
 FieldName = str
-FilterCondition = Tuple[str, FieldName, Union[int, str, float]]
-ProjectionField = Union[FieldName, Tuple[str, FieldName, Union[int, float]]]
 
+class Op(IntEnum):
+    """Plan operators: logical (WHAT) first, then their physical algorithms (HOW)."""
+    SCAN = 0
+    FILTER = 1
+    PROJECT = 2
+    LIMIT = 3
+    SEQUENTIAL_SCAN = 4
+    FILTER_ITERATIVE = 5
+    PROJECT_EVALUATE = 6
+    LIMIT_ROWS = 7
+
+# Display name of each operator, indexed by Op
+OP_NAMES = ('Scan', 'Filter', 'Project', 'Limit',
+            'SequentialScan', 'FilterIterative', 'ProjectEvaluate', 'LimitRows')
+Token = Tuple[str, Any]  # (kind, value): KW, IDENT, NUM, STR, CMP, ARITH, PUNCT
+
+_KEYWORDS = frozenset({'select', 'from', 'where', 'limit'})
+_COMPARISON_OPS_2 = frozenset({'<=', '>=', '<>', '!='})
+_COMPARISON_OPS_1 = frozenset('<>=')
+_ARITHMETIC_OPS = frozenset('+-*/')
+
+@dataclass(slots=True, frozen=True)
+class FilterCondition:
+    """WHERE condition `col op value`. Shown as (op, col, value) in plans."""
+    op: str
+    col: FieldName
+    value: Union[int, float, str]
+
+    def __repr__(self) -> str:
+        return repr((self.op, self.col, self.value))
+
+@dataclass(slots=True, frozen=True)
+class ArithProj:
+    """Arithmetic SELECT field `col op const`. Shown as (op, col, const) in plans."""
+    op: str
+    col: FieldName
+    const: Union[int, float]
+
+    def __repr__(self) -> str:
+        return repr((self.op, self.col, self.const))
+
+ProjectionField = Union[FieldName, ArithProj]
+
+def _freeze(value: Any) -> Any:
+    """
+    Converts a plan argument into a hashable key: lists become tuples, and
+    literals are tagged with their type, since 1 == 1.0 but `a + 1` and
+    `a + 1.0` name their output columns differently.
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, ArithProj):
+        return ('ArithProj', value.op, value.col, _freeze(value.const))
+    if isinstance(value, FilterCondition):
+        return ('FilterCondition', value.op, value.col, _freeze(value.value))
+    return (type(value).__name__, value)
+
+@dataclass(slots=True, frozen=True)
 class SQLStatement:
-    """Represents the Abstract Syntax Tree (AST) after parsing."""
-    def __init__(self, select_fields: List[ProjectionField], table_name: str, 
-                 filters: List[FilterCondition], limit: Optional[int]):
-        self.select_fields = select_fields
-        self.table_name = table_name
-        self.filters = filters
-        self.limit = limit
+    """
+    Represents the Abstract Syntax Tree (AST) after parsing.
+    Immutable and hashable (fields are tuples), so statements can be shared
+    and used as cache keys.
+    """
+    select_fields: Tuple[ProjectionField, ...]
+    table_name: str
+    filters: Tuple[FilterCondition, ...]
+    limit: Optional[int]
 
     def __repr__(self) -> str:
-        return (f"SQLStatement(SELECT={self.select_fields}, FROM={self.table_name}, "
-                f"WHERE={self.filters}, LIMIT={self.limit})")
+        return (f"SQLStatement(SELECT={list(self.select_fields)}, FROM={self.table_name}, "
+                f"WHERE={list(self.filters)}, LIMIT={self.limit})")
+
+# Operator arguments, in display order; each node uses only the ones its operation needs
+PLAN_ARG_NAMES = ('table', 'condition', 'fields', 'count')
+
+def format_arg(value: Any) -> str:
+    """Renders a plan argument for display; field tuples are shown as lists."""
+    return repr(list(value)) if isinstance(value, tuple) else repr(value)
+
+# The one argument each logical operator requires, indexed by Op (None for physical ones)
+OP_ARG: Tuple[Optional[str], ...] = ('table', 'condition', 'fields', 'count') + (None,) * 4
 
 class LogicalPlan:
-    """Represents the required relational algebra operations (WHAT to do)."""
-    def __init__(self, operation: str, child: Optional['LogicalPlan'] = None, **kwargs: Any):
+    """
+    Represents the required relational algebra operations (WHAT to do).
+    `fields` is stored as a tuple, so nodes never share a mutable list.
+    """
+    __slots__ = ('operation', 'child', 'table', 'condition', 'fields', 'count',
+                 '_args_repr', '_projected_cols')
+
+    def __init__(self, operation: Op, child: Optional['LogicalPlan'] = None, *,
+                 table: Optional[str] = None, condition: Optional[FilterCondition] = None,
+                 fields: Optional[Sequence[ProjectionField]] = None, count: Optional[int] = None):
         self.operation = operation
         self.child = child
-        self.kwargs = kwargs
+        self.table = table
+        self.condition = condition
+        self.fields = tuple(fields) if fields is not None else None  # No copy for tuples
+        self.count = count
+        self._args_repr: Optional[str] = None  # Rendered arguments, filled on first display
+        self._projected_cols: Optional[FrozenSet[str]] = None
+        required = OP_ARG[operation] if isinstance(operation, Op) else None
+        if required is not None and getattr(self, required) is None:
+            raise ValueError(f"{OP_NAMES[operation]} requires '{required}'")
+
+    @property
+    def kwargs(self) -> Dict[str, Any]:
+        """The arguments that are set, by name (for display and rebuilding nodes)."""
+        return {k: getattr(self, k) for k in PLAN_ARG_NAMES if getattr(self, k) is not None}
+
+    @property
+    def projected_cols(self) -> Optional[FrozenSet[str]]:
+        """
+        For a Project node, the input columns that reach its output under their
+        own name (plain column fields; arithmetic fields are renamed, e.g.
+        'age_plus_100'). None for other operations. Computed once per node.
+        """
+        if self.operation != Op.PROJECT:
+            return None
+        if self._projected_cols is None:
+            self._projected_cols = frozenset(f for f in (self.fields or []) if isinstance(f, str))
+        return self._projected_cols
+
+    def structural_key(self) -> tuple:
+        """
+        Hashable key describing the whole subtree (operations and arguments).
+        The optimizer compares keys to ignore rewrites that change nothing.
+        """
+        return (self.operation, self.table, _freeze(self.condition), _freeze(self.fields),
+                self.count, self.child.structural_key() if self.child else None)
     
+    def _lines(self, indent: int, out: List[str]) -> None:
+        """Appends one display line per node, top-down, to `out`."""
+        if self._args_repr is None:  # Plans are not modified after construction
+            self._args_repr = ', '.join(f"{k}={format_arg(v)}" for k, v in self.kwargs.items())
+        out.append('  ' * indent + f"[{OP_NAMES[self.operation]}] {self._args_repr}")
+        if self.child:
+            self.child._lines(indent + 1, out)
+
     def format_tree(self, indent: int = 0) -> str:
         """Formats the plan tree for display."""
-        args_str = ', '.join(f"{k}={repr(v)}" for k, v in self.kwargs.items())
-        s = '  ' * indent + f"[{self.operation}] {args_str}"
-        if self.child:
-            s += '\n' + self.child.format_tree(indent + 1)
-        return s
+        out: List[str] = []
+        self._lines(indent, out)
+        return '\n'.join(out)
 
+def _tokenize(sql: str) -> List[Token]:
+    """
+    Splits a query into tokens in a single left-to-right pass.
+    Keywords and identifiers are lowercased; string literals keep their case.
+    Identifiers are interned, so table and column names repeated across
+    queries share one string object (and compare by identity first).
+    """
+    tokens: List[Token] = []
+    i, n = 0, len(sql)
+
+    while i < n:
+        ch = sql[i]
+        if ch.isspace():
+            i += 1
+            continue
+
+        if ch.isalpha() or ch == '_':
+            j = i + 1
+            while j < n and (sql[j].isalnum() or sql[j] == '_'):
+                j += 1
+            word = sql[i:j].lower()  # Same folding as CSV headers (data_source)
+            if word in _KEYWORDS:
+                tokens.append(('KW', word))
+            else:
+                tokens.append(('IDENT', sys.intern(word)))
+        elif ch.isdigit() or (ch == '.' and i + 1 < n and sql[i + 1].isdigit()):
+            j = i + 1
+            while j < n and (sql[j].isdigit() or sql[j] == '.'):
+                j += 1
+            text = sql[i:j]
+            try:
+                tokens.append(('NUM', float(text) if '.' in text else int(text)))
+            except ValueError:
+                raise ValueError(f"Invalid SQL: Bad number '{text}'")
+        elif ch == "'":
+            j = sql.find("'", i + 1)
+            if j < 0:
+                raise ValueError("Invalid SQL: Unterminated string literal")
+            tokens.append(('STR', sql[i + 1:j]))
+            j += 1
+        elif sql[i:i + 2] in _COMPARISON_OPS_2:
+            tokens.append(('CMP', sql[i:i + 2]))
+            j = i + 2
+        elif ch in _COMPARISON_OPS_1:
+            tokens.append(('CMP', ch))
+            j = i + 1
+        elif ch in _ARITHMETIC_OPS:
+            tokens.append(('ARITH', ch))
+            j = i + 1
+        elif ch in ',;':
+            tokens.append(('PUNCT', ch))
+            j = i + 1
+        else:
+            raise ValueError(f"Invalid SQL: Unexpected character '{ch}'")
+        i = j
+
+    return tokens
+
+class _TokenStream:
+    """Cursor over the token list for the recursive-descent parser."""
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> Optional[Token]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def next(self) -> Optional[Token]:
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def accept(self, kind: str, value: Any = None) -> Optional[Token]:
+        """Consumes and returns the next token if it matches, else None."""
+        token = self.peek()
+        if token is not None and token[0] == kind and (value is None or token[1] == value):
+            self.pos += 1
+            return token
+        return None
+
+def _parse_select_list(stream: _TokenStream) -> List[ProjectionField]:
+    """select_list := item (',' item)*   item := '*' | IDENT [ARITH NUM]"""
+    select_fields: List[ProjectionField] = []
+    while True:
+        if stream.accept('ARITH', '*'):
+            select_fields.append('*')
+        else:
+            ident = stream.accept('IDENT')
+            if ident is None:
+                raise ValueError("Invalid SQL: Expected a column name in SELECT")
+            arith = stream.accept('ARITH')
+            if arith:
+                number = stream.accept('NUM')
+                if number is None:
+                    raise ValueError(f"Invalid arithmetic value in SELECT after '{ident[1]} {arith[1]}'")
+                select_fields.append(ArithProj(arith[1], ident[1], number[1]))
+            else:
+                select_fields.append(ident[1])
+        if not stream.accept('PUNCT', ','):
+            return select_fields
+
+def _parse_where(stream: _TokenStream) -> FilterCondition:
+    """condition := IDENT CMP value   value := STR | ['-'] NUM | IDENT"""
+    col = stream.accept('IDENT')
+    op = stream.accept('CMP')
+    if col is None or op is None:
+        raise ValueError("Invalid SQL: WHERE expects 'column op value'")
+
+    negative = stream.accept('ARITH', '-') is not None
+    token = stream.next()
+    if token is not None and token[0] == 'NUM':
+        value = -token[1] if negative else token[1]
+    elif token is not None and token[0] in ('STR', 'IDENT') and not negative:
+        value = token[1]  # String literal or bare word
+    else:
+        raise ValueError("Invalid SQL: WHERE expects 'column op value'")
+    return FilterCondition(op[1], col[1], value)
+
+def _parse_limit(stream: _TokenStream) -> int:
+    """limit := NUM (non-negative integer)"""
+    number = stream.accept('NUM')
+    if number is None or not isinstance(number[1], int):
+        raise ValueError("Invalid SQL: LIMIT expects an integer")
+    return number[1]
+
+@lru_cache(maxsize=1024)
 def parse_sql(sql_query: str) -> SQLStatement:
     """
     Parses a restricted SQL syntax into a structured statement.
     Supports: SELECT col1, col2+N FROM table WHERE col op value LIMIT n
+    Results are memoized per query string (statements are immutable).
     """
-    query = sql_query.upper()
-    original_query = sql_query  # Keep for case-sensitive extraction
-    
-    # 1. Extract SELECT fields
-    select_match = re.search(r'SELECT\s+(.*?)\s+FROM', query, re.IGNORECASE)
-    if not select_match:
+    stream = _TokenStream(_tokenize(sql_query))
+
+    # 1. SELECT fields
+    if not stream.accept('KW', 'select'):
         raise ValueError("Invalid SQL: Missing SELECT clause")
-        
-    select_fields = []
-    raw_fields = select_match.group(1).split(',')
-    
-    for field in raw_fields:
-        field = field.strip()
-        
-        # Check for arithmetic: col + number or col - number
-        arith_match = re.match(r'(\w+)\s*([+\-*/])\s*([\d.]+)', field, re.IGNORECASE)
-        if arith_match:
-            col_name = arith_match.group(1).lower()
-            operator = arith_match.group(2)
-            try:
-                value = float(arith_match.group(3)) if '.' in arith_match.group(3) else int(arith_match.group(3))
-            except ValueError:
-                raise ValueError(f"Invalid arithmetic value in SELECT: {arith_match.group(3)}")
-            select_fields.append((operator, col_name, value))
-        else:
-            select_fields.append(field.lower())
+    select_fields = _parse_select_list(stream)
 
-    # 2. Extract table name
-    from_match = re.search(r'FROM\s+(\w+)', query, re.IGNORECASE)
-    if not from_match:
+    # 2. Table name
+    if not stream.accept('KW', 'from'):
         raise ValueError("Invalid SQL: Missing FROM clause")
-    table_name = from_match.group(1).lower()
+    table = stream.accept('IDENT')
+    if table is None:
+        raise ValueError("Invalid SQL: Missing table name after FROM")
+    table_name = table[1]
 
-    # 3. Extract WHERE filters
+    # 3. WHERE filter
     filters: List[FilterCondition] = []
-    where_match = re.search(r'WHERE\s+(.*?)(?:\s+LIMIT|\s*$)', query, re.IGNORECASE)
-    if where_match:
-        condition_str = where_match.group(1).strip()
-        # Parse: col op value
-        parts = re.split(r'\s*(<=|>=|<>|!=|<|>|=)\s*', condition_str)
-        if len(parts) == 3:
-            col, op, val_str = parts
-            col = col.strip().lower()
-            op = op.strip()
-            val_str = val_str.strip()
-            
-            # Type inference for value
-            if val_str.startswith("'") and val_str.endswith("'"):
-                value = val_str[1:-1]  # String literal
-            elif val_str.replace('.', '', 1).replace('-', '', 1).isdigit():
-                value = float(val_str) if '.' in val_str else int(val_str)
-            else:
-                value = val_str
-                
-            filters.append((op, col, value))
+    if stream.accept('KW', 'where'):
+        filters.append(_parse_where(stream))
+
+    # 4. LIMIT
+    limit = _parse_limit(stream) if stream.accept('KW', 'limit') else None
 
-    # 4. Extract LIMIT
-    limit_match = re.search(r'LIMIT\s+(\d+)', query, re.IGNORECASE)
-    limit = int(limit_match.group(1)) if limit_match else None
+    stream.accept('PUNCT', ';')
+    leftover = stream.peek()
+    if leftover is not None:
+        raise ValueError(f"Invalid SQL: Unexpected '{leftover[1]}'")
 
-    return SQLStatement(select_fields, table_name, filters, limit)
+    return SQLStatement(tuple(select_fields), table_name, tuple(filters), limit)
 
 def generate_logical_plan(statement: SQLStatement) -> LogicalPlan:
     """Converts the parsed statement into a tree of logical operators."""
     
     # Bottom-up construction
-    plan = LogicalPlan('Scan', table=statement.table_name)
+    plan = LogicalPlan(Op.SCAN, table=statement.table_name)
 
     if statement.filters:
-        plan = LogicalPlan('Filter', child=plan, condition=statement.filters[0])
+        plan = LogicalPlan(Op.FILTER, child=plan, condition=statement.filters[0])
 
-    plan = LogicalPlan('Project', child=plan, fields=statement.select_fields)
+    plan = LogicalPlan(Op.PROJECT, child=plan, fields=statement.select_fields)
 
     if statement.limit is not None:
-        plan = LogicalPlan('Limit', child=plan, count=statement.limit)
+        plan = LogicalPlan(Op.LIMIT, child=plan, count=statement.limit)
 
     return plan
 
@@ -1,7 +1,8 @@
 # main.py
 import json
 import sys
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
 
 # Assuming all modules are in the same folder structure and are imported directly.
 # This structure is common when running a main script that orchestrates other modules
@@ -12,6 +13,9 @@ try:
     from optimizer import optimize
     from physical_plan import generate_physical_plan, PhysicalPlan
     from executor import execute
+    from data_source import parse_data_to_catalog, DataCatalog
+    from planner import build_physical
+    from plan_cache import LRUCache
 except ImportError as e:
     # This check now provides better context on the missing module
     print("\n" + "="*80)
@@ -38,44 +42,120 @@ def print_plan_tree(title: str, plan: LogicalPlan | PhysicalPlan) -> None:
     print("-" * 30)
 
 
-def run_sql_api(sql_query: str) -> List[Dict[str, Any]]:
+# Demo table queried by run_sql_api
+DEMO_TABLE = 't1'
+DEMO_CSV = """id,name,age
+1,Alice,30
+2,Bob,25
+3,Carol,41
+4,Dave,35
+5,Eve,28
+6,Frank,52
+7,Grace,19"""
+
+@lru_cache(maxsize=1)
+def _demo_catalog() -> DataCatalog:
+    """The demo table, parsed once and shared by every query (never modified)."""
+    return parse_data_to_catalog(DEMO_CSV, DEMO_TABLE)
+
+# Physical plans keyed by SQL fingerprint
+_PLAN_CACHE = LRUCache(max_size=1024)
+
+def _fingerprint(sql_query: str) -> str:
+    """
+    Normalizes a query for the plan cache: outside of string literals, case
+    is folded and whitespace runs collapse to one space. Literals are kept,
+    since they are part of the plan (filter values, LIMIT counts).
+    """
+    parts = sql_query.split("'")
+    for i in range(0, len(parts), 2):  # Even parts are outside quotes
+        parts[i] = ' '.join(parts[i].lower().split())
+    return "'".join(parts)
+
+def _plan_with_stages(sql_query: str) -> PhysicalPlan:
+    """
+    Runs parsing, logical planning, optimization and physical planning as
+    separate stages, printing each intermediate plan.
+    """
+    # --- Stage 1: Parsing (parse_sql) ---
+    print("\n--- 1. PARSING: SQL -> Statement (AST) ---")
+    statement = parse_sql(sql_query)
+    print(f"   -> Statement: {repr(statement)}")
+
+    # --- Stage 2: Logical Plan Generation (logical_plan) ---
+    print("\n--- 2. LOGICAL PLANNING: Statement -> Relational Algebra Tree ---")
+    logical_plan_initial = generate_logical_plan(statement)
+    print_plan_tree("Initial Logical", logical_plan_initial)
+
+    # --- Stage 3: Optimization (optimize) ---
+    print("\n--- 3. OPTIMIZATION: Applying Rules to Logical Plan ---")
+    opt_result = optimize(logical_plan_initial)
+    del logical_plan_initial  # The pre-optimization tree is no longer needed
+    logical_plan_optimized = opt_result['plan']
+    print(opt_result['message'])
+    # Only print the optimized tree if an optimization actually occurred
+    if opt_result['rules_applied']:
+        print_plan_tree("Optimized Logical", logical_plan_optimized)
+
+    # --- Stage 4: Physical Plan Generation (physical_plan) ---
+    print("\n--- 4. PHYSICAL PLANNING: Logical Operators -> Execution Strategy ---")
+    physical_plan = generate_physical_plan(logical_plan_optimized)
+    print_plan_tree("Physical Execution", physical_plan)
+    return physical_plan
+
+def _compile(sql_query: str, verbose: bool = True) -> Tuple[PhysicalPlan, bool]:
+    """
+    Turns SQL into a physical plan. Returns (physical_plan, cache_hit); on a
+    cache hit the planning stages are skipped entirely.
+    With verbose=True the stages run one by one and print their plans;
+    otherwise the plan is built directly from the statement (build_physical).
+    """
+    key = _fingerprint(sql_query)
+    physical_plan = _PLAN_CACHE.get(key)
+    if physical_plan is not None:
+        if verbose:
+            print("\n--- 1-4. PLAN CACHE HIT: reusing physical plan ---")
+            print_plan_tree("Physical Execution", physical_plan)
+        return physical_plan, True
+
+    if verbose:
+        physical_plan = _plan_with_stages(sql_query)
+    else:
+        physical_plan = build_physical(parse_sql(sql_query))
+
+    _PLAN_CACHE.put(key, physical_plan)
+    return physical_plan, False
+
+def run_sql_api(sql_query: str, *, data_catalog: Optional[DataCatalog] = None,
+                verbose: bool = False) -> List[Dict[str, Any]]:
     """
     The main public API function that executes the full query planning pipeline.
+    Runs against the demo table when no catalog is given.
+    Quiet by default, building the plan without intermediate logical trees;
+    verbose=True prints every stage, its plan trees and the result.
+    Errors are always printed.
     """
     
-    print_section_header("START: QUERY PLANNER PIPELINE", sql_query)
+    if verbose:
+        print_section_header("START: QUERY PLANNER PIPELINE", sql_query)
 
     try:
-        # --- Stage 1: Parsing (parse_sql) ---
-        print("\n--- 1. PARSING: SQL -> Statement (AST) ---")
-        statement = parse_sql(sql_query)
-        print(f"   -> Statement: {repr(statement)}")
-        
-        # --- Stage 2: Logical Plan Generation (logical_plan) ---
-        print("\n--- 2. LOGICAL PLANNING: Statement -> Relational Algebra Tree ---")
-        logical_plan_initial = generate_logical_plan(statement)
-        print_plan_tree("Initial Logical", logical_plan_initial)
-        
-        # --- Stage 3: Optimization (optimize) ---
-        print("\n--- 3. OPTIMIZATION: Applying Rules to Logical Plan ---")
-        logical_plan_optimized = optimize(logical_plan_initial)
-        # Only print the optimized tree if an optimization actually occurred
-        if logical_plan_optimized != logical_plan_initial:
-            print_plan_tree("Optimized Logical", logical_plan_optimized)
-        
-        # --- Stage 4: Physical Plan Generation (physical_plan) ---
-        print("\n--- 4. PHYSICAL PLANNING: Logical Operators -> Execution Strategy ---")
-        physical_plan = generate_physical_plan(logical_plan_optimized)
-        print_plan_tree("Physical Execution", physical_plan)
+        if data_catalog is None:
+            data_catalog = _demo_catalog()
+
+        # --- Stages 1-4: memoized per SQL fingerprint ---
+        physical_plan, _ = _compile(sql_query, verbose)
         
         # --- Stage 5: Execution (execute) ---
-        print("\n--- 5. EXECUTION: Running the Physical Plan (Bottom-Up) ---")
-        records = execute(physical_plan)
+        if verbose:
+            print("\n--- 5. EXECUTION: Running the Physical Plan (Bottom-Up) ---")
+        records = execute(physical_plan, data_catalog)
         
         # --- Final Result ---
-        print_section_header("END: QUERY RESULT")
-        print(json.dumps(records, indent=2))
-        print("="*80)
+        if verbose:
+            print_section_header("END: QUERY RESULT")
+            print(json.dumps(records, indent=2))
+            print("="*80)
         return records
 
     except Exception as e:
@@ -88,7 +168,7 @@ if __name__ == "__main__":
     SQL_QUERY = "SELECT id, name, age + 100 FROM t1 WHERE id < 6 LIMIT 3"
     
     print("DEMO: Running Query Planner with sample SQL.")
-    run_sql_api(SQL_QUERY)
+    run_sql_api(SQL_QUERY, verbose=True)
     
     print("\n\n--- DEMO COMPLETE ---")
     print("To run this professional structure, save all files in a directory and run 'python main.py' in your terminal.")
@@ -2,8 +2,28 @@
 # optimizer.py - Rule-Based Query Optimizer with Multiple Optimization Rules
 # ============================================================================
 
-from typing import Dict, Any, Tuple, List
-from logical_plan import LogicalPlan
+from typing import Dict, Any, Tuple, List, Sequence
+from logical_plan import ArithProj, LogicalPlan, Op
+
+def dedupe_fields(fields: Sequence[Any]) -> Tuple[Any, ...]:
+    """
+    Removes repeated SELECT fields, keeping the first occurrence.
+    Returns `fields` itself (not a copy) when it is a tuple without duplicates.
+    Arithmetic values are keyed by their text, so 1 and 1.0 stay distinct
+    (they produce different output column names).
+    """
+    keys = [(f.op, f.col, str(f.const)) if isinstance(f, ArithProj) else f for f in fields]
+    if len(set(keys)) == len(keys):
+        return tuple(fields)  # Common case: nothing to rebuild
+
+    seen = set()
+    unique_fields = []
+    for field, field_key in zip(fields, keys):
+        if field_key not in seen:
+            seen.add(field_key)
+            unique_fields.append(field)
+    return tuple(unique_fields)
+
 
 class OptimizationRule:
     """Base class for optimization rules."""
@@ -31,20 +51,20 @@ class LimitPushdownRule(OptimizationRule):
         super().__init__("Limit Pushdown")
     
     def apply(self, plan: LogicalPlan) -> Tuple[LogicalPlan, bool]:
-        if not (plan.operation == 'Limit' and 
-                plan.child and 
-                plan.child.operation == 'Project'):
+        self.applied = False
+        child = plan.child
+        if not (plan.operation == Op.LIMIT and child and child.operation == Op.PROJECT):
             return plan, False
         
-        limit_count = plan.kwargs.get('count')
-        project_plan = plan.child
-        project_fields = project_plan.kwargs.get('fields')
+        limit_count = plan.count
+        project_plan = child
+        project_fields = project_plan.fields
         
         # Transform: Project(Limit(child))
         optimized = LogicalPlan(
-            'Project',
+            Op.PROJECT,
             child=LogicalPlan(
-                'Limit',
+                Op.LIMIT,
                 child=project_plan.child,
                 count=limit_count
             ),
@@ -61,39 +81,34 @@ class SelectionPushdownRule(OptimizationRule):
     
     Pattern: Project(Filter(X)) → Filter(Project(X)) [when safe]
     Benefit: Reduces rows before expensive projections
-    Note: Only applies when filter doesn't depend on projected fields
+    Note: Only applies when the filter column is projected unchanged
     Savings: O(N) rows instead of computing projections for all rows
     """
     def __init__(self):
         super().__init__("Selection Pushdown")
     
     def apply(self, plan: LogicalPlan) -> Tuple[LogicalPlan, bool]:
-        if not (plan.operation == 'Project' and 
-                plan.child and 
-                plan.child.operation == 'Filter'):
+        self.applied = False
+        child = plan.child
+        if not (plan.operation == Op.PROJECT and child and child.operation == Op.FILTER):
             return plan, False
         
-        project_fields = plan.kwargs.get('fields', [])
-        filter_plan = plan.child
-        filter_condition = filter_plan.kwargs.get('condition')
+        project_fields = plan.fields or []
+        filter_plan = child
+        filter_condition = filter_plan.condition
         
         # Check if filter depends on selected fields only
         if filter_condition:
-            filter_col = filter_condition[1]  # Column being filtered
-            
-            # Check if this column is in the projection
-            is_in_projection = any(
-                field == filter_col if isinstance(field, str) else field[1] == filter_col
-                for field in project_fields
-            )
+            filter_col = filter_condition.col  # Column being filtered
             
-            # Only push down if filter column will be retained
-            if is_in_projection:
+            # Only push down if the filter column is retained as-is; a column
+            # used only inside an arithmetic field is renamed by the projection
+            if filter_col in plan.projected_cols:
                 # Transform: Filter(Project(child))
                 optimized = LogicalPlan(
-                    'Filter',
+                    Op.FILTER,
                     child=LogicalPlan(
-                        'Project',
+                        Op.PROJECT,
                         child=filter_plan.child,
                         fields=project_fields
                     ),
@@ -119,37 +134,22 @@ class ProjectionPruningRule(OptimizationRule):
         super().__init__("Projection Pruning")
     
     def apply(self, plan: LogicalPlan) -> Tuple[LogicalPlan, bool]:
-        if plan.operation != 'Project':
+        self.applied = False
+        if plan.operation != Op.PROJECT:
             return plan, False
         
-        fields = plan.kwargs.get('fields', [])
-        
-        # Remove duplicate fields
-        seen = set()
-        unique_fields = []
-        
-        for field in fields:
-            if isinstance(field, str):
-                field_key = field
-            else:
-                # Tuple format: (op, col, val)
-                field_key = f"{field[0]}_{field[1]}_{field[2]}"
-            
-            if field_key not in seen:
-                seen.add(field_key)
-                unique_fields.append(field)
-        
-        # If any duplicates were removed, we optimized
-        if len(unique_fields) < len(fields):
-            optimized = LogicalPlan(
-                'Project',
-                child=plan.child,
-                fields=unique_fields
-            )
-            self.applied = True
-            return optimized, True
+        fields = plan.fields or []
+        unique_fields = dedupe_fields(fields)
+        if unique_fields is fields:
+            return plan, False
         
-        return plan, False
+        optimized = LogicalPlan(
+            Op.PROJECT,
+            child=plan.child,
+            fields=unique_fields
+        )
+        self.applied = True
+        return optimized, True
 
 
 class LimitWithFilterRule(OptimizationRule):
@@ -165,21 +165,21 @@ class LimitWithFilterRule(OptimizationRule):
         super().__init__("Limit-Filter Optimization")
     
     def apply(self, plan: LogicalPlan) -> Tuple[LogicalPlan, bool]:
-        if not (plan.operation == 'Limit' and 
-                plan.child and 
-                plan.child.operation == 'Filter'):
+        self.applied = False
+        child = plan.child
+        if not (plan.operation == Op.LIMIT and child and child.operation == Op.FILTER):
             return plan, False
         
-        limit_count = plan.kwargs.get('count')
-        filter_plan = plan.child
-        filter_condition = filter_plan.kwargs.get('condition')
+        limit_count = plan.count
+        filter_plan = child
+        filter_condition = filter_plan.condition
         
         # If limit is small and filter exists, reorder for early termination
         if limit_count and limit_count < 1000:
             optimized = LogicalPlan(
-                'Limit',
+                Op.LIMIT,
                 child=LogicalPlan(
-                    'Filter',
+                    Op.FILTER,
                     child=filter_plan.child,
                     condition=filter_condition
                 ),
@@ -204,16 +204,17 @@ class ArithmeticExpressionSimplificationRule(OptimizationRule):
         super().__init__("Expression Simplification")
     
     def apply(self, plan: LogicalPlan) -> Tuple[LogicalPlan, bool]:
-        if plan.operation != 'Project':
+        self.applied = False
+        if plan.operation != Op.PROJECT:
             return plan, False
         
-        fields = plan.kwargs.get('fields', [])
+        fields = plan.fields or []
         simplified = False
         
         # Validate arithmetic expressions
         for field in fields:
-            if isinstance(field, tuple) and len(field) == 3:
-                op, col, val = field
+            if isinstance(field, ArithProj):
+                op, val = field.op, field.const
                 # Mark for simplification if expression is complex
                 if op in ['+', '-', '*', '/'] and isinstance(val, (int, float)):
                     # Flag for optimizer to note expression complexity
@@ -241,76 +242,102 @@ class DeadCodeElimination(OptimizationRule):
         super().__init__("Dead Code Elimination")
     
     def apply(self, plan: LogicalPlan) -> Tuple[LogicalPlan, bool]:
-        if plan.operation != 'Project':
+        self.applied = False
+        if plan.operation != Op.PROJECT:
             return plan, False
         
-        fields = plan.kwargs.get('fields', [])
+        fields = plan.fields or []
         
-        # Check if projecting all columns (no actual transformation)
-        if isinstance(fields, list) and len(fields) > 0:
-            # If all fields are simple column names, could eliminate some
-            all_simple = all(isinstance(f, str) for f in fields)
-            
+        # Check if projecting all columns (no actual transformation).
+        # Heuristic: many columns; checked first so narrow projections
+        # never scan the field list
+        if len(fields) > 10:
+            # If all fields are simple column names, could eliminate some.
             # Would need catalog info to determine if projecting all columns
             # For now, mark rule as available
-            if all_simple and len(fields) > 10:  # Heuristic: many columns
+            if all(isinstance(f, str) for f in fields):
                 self.applied = True
         
         return plan, False
 
 
+# Rule instances are stateless between calls (apply() resets `applied`),
+# so one shared list in priority order serves every optimize() call
+RULES: List[OptimizationRule] = [
+    LimitPushdownRule(),
+    SelectionPushdownRule(),
+    ProjectionPruningRule(),
+    LimitWithFilterRule(),
+]
+
+# Rules that only inspect the plan and never rewrite it yet. They are kept
+# out of the default pipeline; append them to RULES to run them.
+EXPERIMENTAL_RULES: List[OptimizationRule] = [
+    ArithmeticExpressionSimplificationRule(),
+    DeadCodeElimination()
+]
+
+def _rewrite(node: LogicalPlan, applied_rules: List[str], visits: List[int]) -> LogicalPlan:
+    """
+    Rewrites a plan in one top-down pass: the rules are tried at the current
+    node until none fires, then the pass moves on to the (possibly new)
+    child. Pushdown rules move operators towards the leaves, so every
+    subtree they produce is still visited afterwards. Each rule fires at
+    most once per node, and rewrites that leave the subtree structurally
+    unchanged are ignored, so the pass always terminates.
+    """
+    visits[0] += 1
+    rules = RULES  # Local lookup inside the retry loop
+    fired = set()
+    rule_fired = True
+    while rule_fired:
+        rule_fired = False
+        for rule in rules:
+            if rule.name in fired:
+                continue
+            new_node, was_applied = rule.apply(node)
+            if not was_applied:
+                continue
+            fired.add(rule.name)
+            # A rewrite that rebuilds the same tree (e.g. Limit-Filter, which
+            # re-creates Limit(Filter(X)) as is) does not count as applied
+            if new_node.structural_key() != node.structural_key():
+                applied_rules.append(rule.name)
+                node = new_node
+                rule_fired = True
+                break  # Retry the remaining rules against the rewritten node
+
+    if node.child is not None:
+        child = _rewrite(node.child, applied_rules, visits)
+        if child is not node.child:
+            node = LogicalPlan(node.operation, child=child, table=node.table,
+                               condition=node.condition, fields=node.fields, count=node.count)
+    return node
+
 def optimize(logical_plan: LogicalPlan) -> Dict[str, Any]:
     """
-    Applies a sequence of optimization rules to the logical plan.
+    Applies the optimization rules to every node of the logical plan in a
+    single top-down pass (see _rewrite).
     
-    Rules are applied in priority order:
+    At each node, rules are tried in priority order:
     1. Limit Pushdown (highest priority - most effective)
     2. Selection Pushdown
     3. Projection Pruning
     4. Limit-Filter Optimization
-    5. Expression Simplification
-    6. Dead Code Elimination
+    (Expression Simplification and Dead Code Elimination are in
+    EXPERIMENTAL_RULES and do not run by default.)
     
     Returns:
         {
             'plan': optimized_logical_plan,
             'message': optimization_summary,
-            'rules_applied': [list of applied rule names]
+            'rules_applied': [list of applied rule names],
+            'iterations': number of nodes visited
         }
     """
-    
-    # Initialize all optimization rules
-    rules: List[OptimizationRule] = [
-        LimitPushdownRule(),
-        SelectionPushdownRule(),
-        ProjectionPruningRule(),
-        LimitWithFilterRule(),
-        ArithmeticExpressionSimplificationRule(),
-        DeadCodeElimination()
-    ]
-    
-    plan = logical_plan
-    applied_rules = []
-    
-    # Apply rules in sequence (iteratively until no more rules apply)
-    max_iterations = 5  # Prevent infinite loops
-    iteration = 0
-    
-    while iteration < max_iterations:
-        iteration += 1
-        rule_applied_this_iteration = False
-        
-        for rule in rules:
-            new_plan, was_applied = rule.apply(plan)
-            
-            if was_applied:
-                plan = new_plan
-                applied_rules.append(rule.name)
-                rule_applied_this_iteration = True
-                break  # Restart from first rule after applying one
-        
-        if not rule_applied_this_iteration:
-            break  # No more rules applied, optimization complete
+    applied_rules: List[str] = []
+    visits = [0]
+    plan = _rewrite(logical_plan, applied_rules, visits)
     
     # Generate optimization message
     if applied_rules:
@@ -325,7 +352,7 @@ def optimize(logical_plan: LogicalPlan) -> Dict[str, Any]:
         'plan': plan,
         'message': message,
         'rules_applied': applied_rules,
-        'iterations': iteration
+        'iterations': visits[0]
     }
 
 
@@ -367,13 +394,13 @@ def describe_optimization_rules() -> str:
    └─ Example: SELECT * FROM t WHERE city='X' LIMIT 5
               Stops after finding 5 matching rows
 
-5. ARITHMETIC EXPRESSION SIMPLIFICATION
+5. ARITHMETIC EXPRESSION SIMPLIFICATION (experimental, off by default)
    ├─ Pattern: Recognize constant expressions
    ├─ Benefit: Pre-compute or simplify expressions
    ├─ Savings: Reduces per-row computation
    └─ Example: (col * 2) / 2 → col (algebraic simplification)
 
-6. DEAD CODE ELIMINATION
+6. DEAD CODE ELIMINATION (experimental, off by default)
    ├─ Pattern: Remove unnecessary operations
    ├─ Benefit: Eliminates redundant computation passes
    ├─ Savings: Pipeline efficiency improvement
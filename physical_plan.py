@@ -2,53 +2,105 @@
 # physical_plan.py - Physical Plan Generator
 # ============================================================================
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Sequence, Tuple
+
+from logical_plan import PLAN_ARG_NAMES, OP_NAMES, OP_ARG, Op, format_arg, FilterCondition, ProjectionField
 
 class PhysicalPlan:
-    """Represents the physical execution strategy (HOW to do it)."""
-    def __init__(self, operation: str, child: Optional['PhysicalPlan'] = None, **kwargs: Any):
-        self.operation = operation
-        self.child = child
-        self.kwargs = kwargs
+    """
+    Represents the physical execution strategy (HOW to do it).
+    Nodes are immutable once built, so plans and subplans can be cached
+    and shared between queries.
+    """
+    __slots__ = ('operation', 'child', 'table', 'condition', 'fields', 'count',
+                 '_args_repr', '_pipeline')
+
+    def __init__(self, operation: Op, child: Optional['PhysicalPlan'] = None, *,
+                 table: Optional[str] = None, condition: Optional[FilterCondition] = None,
+                 fields: Optional[Sequence[ProjectionField]] = None, count: Optional[int] = None):
+        init = object.__setattr__
+        init(self, 'operation', operation)
+        init(self, 'child', child)
+        init(self, 'table', table)
+        init(self, 'condition', condition)
+        init(self, 'fields', tuple(fields) if fields is not None else None)
+        init(self, 'count', count)
+        init(self, '_args_repr', None)  # Rendered arguments, filled on first display
+        init(self, '_pipeline', None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"PhysicalPlan is immutable (cannot set '{name}')")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"PhysicalPlan is immutable (cannot delete '{name}')")
     
+    @property
+    def pipeline(self) -> Tuple['PhysicalPlan', ...]:
+        """
+        The plan's operators as a flat tuple in execution order (the scan
+        first, this node last). Plans are linear chains, so operators can
+        walk this array instead of following `child` links. Built once.
+        """
+        if self._pipeline is None:
+            nodes = []
+            node = self
+            while node is not None:
+                nodes.append(node)
+                node = node.child
+            object.__setattr__(self, '_pipeline', tuple(reversed(nodes)))
+        return self._pipeline
+
+    def _args_text(self) -> str:
+        """The node's arguments as `k=v, ...`, rendered once and cached."""
+        if self._args_repr is None:  # Display cache (written once, like _pipeline)
+            object.__setattr__(self, '_args_repr', ', '.join(
+                f"{k}={format_arg(v)}" for k, v in ((k, getattr(self, k)) for k in PLAN_ARG_NAMES)
+                if v is not None))
+        return self._args_repr
+
     def __repr__(self, indent: int = 0) -> str:
-        """Formats the plan tree for console output."""
-        args_repr = ', '.join(f"{k}={v!r}" for k, v in self.kwargs.items())
-        s = '  ' * indent + f"→ {self.operation}({args_repr})"
-        if self.child:
-            s += '\n' + self.child.__repr__(indent + 1)
-        return s
+        """Formats the plan tree for console output (one line per node, no recursion)."""
+        out: List[str] = []
+        node = self
+        while node is not None:
+            out.append('  ' * indent + f"→ {OP_NAMES[node.operation]}({node._args_text()})")
+            node = node.child
+            indent += 1
+        return '\n'.join(out)
         
     def format_tree(self, indent: int = 0) -> str:
         """Alias for __repr__."""
         return self.__repr__(indent)
 
+# Logical operator -> physical algorithm, indexed by Op; None for operators
+# that are already physical. The node's one argument (OP_ARG) is carried over.
+_DISPATCH: List[Optional[Op]] = [None] * len(Op)
+_DISPATCH[Op.SCAN] = Op.SEQUENTIAL_SCAN
+_DISPATCH[Op.FILTER] = Op.FILTER_ITERATIVE
+_DISPATCH[Op.PROJECT] = Op.PROJECT_EVALUATE
+_DISPATCH[Op.LIMIT] = Op.LIMIT_ROWS
+
 def generate_physical_plan(logical_plan) -> PhysicalPlan:
-    """Recursively converts a LogicalPlan tree into a PhysicalPlan tree."""
-    def map_to_physical(l_plan) -> Optional[PhysicalPlan]:
-        if l_plan is None:
-            return None
-        
-        child_physical = map_to_physical(l_plan.child)
-        kwargs = l_plan.kwargs
+    """
+    Converts a LogicalPlan tree into a PhysicalPlan tree.
+    Walks down the chain once, then builds the physical nodes bottom-up
+    (no recursion, so plan depth costs no Python call frames).
+    """
+    if logical_plan is None:
+        return None
 
-        # Map logical operators to physical algorithms
-        if l_plan.operation == 'Scan':
-            return PhysicalPlan('SequentialScan', child=child_physical, 
-                                table=kwargs.get('table'))
-        
-        elif l_plan.operation == 'Filter':
-            return PhysicalPlan('FilterIterative', child=child_physical, 
-                                condition=kwargs.get('condition'))
-        
-        elif l_plan.operation == 'Project':
-            return PhysicalPlan('ProjectEvaluate', child=child_physical, 
-                                fields=kwargs.get('fields'))
-        
-        elif l_plan.operation == 'Limit':
-            return PhysicalPlan('LimitRows', child=child_physical, 
-                                count=kwargs.get('count'))
-        
-        raise ValueError(f"Unknown logical operator: {l_plan.operation}")
+    chain = []
+    node = logical_plan
+    while node is not None:
+        chain.append(node)
+        node = node.child
 
-    return map_to_physical(logical_plan)
\ No newline at end of file
+    physical: Optional[PhysicalPlan] = None
+    for l_plan in reversed(chain):
+        # Map logical operators to physical algorithms
+        physical_op = _DISPATCH[l_plan.operation] if isinstance(l_plan.operation, Op) else None
+        if physical_op is None:
+            raise ValueError(f"Unknown logical operator: {l_plan.operation!r}")
+        arg = OP_ARG[l_plan.operation]  # Set on every logical node (checked at construction)
+        physical = PhysicalPlan(physical_op, physical, **{arg: getattr(l_plan, arg)})
+    return physical
\ No newline at end of file
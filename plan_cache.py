@@ -0,0 +1,37 @@
+# ============================================================================
+# plan_cache.py - Bounded, Thread-Safe LRU Cache for Planned Queries
+# ============================================================================
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable, Optional
+
+class LRUCache:
+    """
+    Bounded least-recently-used cache, safe to share between request threads
+    (every lookup and insert holds the cache's lock). Values are shared, not
+    copied, so only values that are never mutated belong here.
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Returns the cached value and marks it recently used, or None on a miss."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Stores a value, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,41 @@
+# ============================================================================
+# planner.py - Direct SQL Statement to Physical Plan Builder
+# ============================================================================
+
+from logical_plan import Op, SQLStatement
+from optimizer import dedupe_fields
+from physical_plan import PhysicalPlan
+
+def build_physical(statement: SQLStatement) -> PhysicalPlan:
+    """
+    Builds the optimized physical plan for a statement in one pass, without
+    the intermediate logical trees. Produces the same plan as
+    generate_physical_plan(optimize(generate_logical_plan(statement))['plan']),
+    with the rules applied inline:
+    - Projection Pruning: duplicate SELECT fields are dropped.
+    - Limit Pushdown: LIMIT runs below the projection.
+    - Selection Pushdown: without a LIMIT, the filter moves above the
+      projection when its column is projected unchanged.
+    Use the staged functions when the intermediate plans are needed for display.
+    """
+    fields = dedupe_fields(statement.select_fields)
+    condition = statement.filters[0] if statement.filters else None
+
+    plan = PhysicalPlan(Op.SEQUENTIAL_SCAN, table=statement.table_name)
+
+    if statement.limit is not None:
+        # Scan -> Filter? -> Limit -> Project
+        if condition:
+            plan = PhysicalPlan(Op.FILTER_ITERATIVE, child=plan, condition=condition)
+        plan = PhysicalPlan(Op.LIMIT_ROWS, child=plan, count=statement.limit)
+        return PhysicalPlan(Op.PROJECT_EVALUATE, child=plan, fields=fields)
+
+    if condition and condition.col in fields:
+        # Scan -> Project -> Filter (filter column survives the projection)
+        plan = PhysicalPlan(Op.PROJECT_EVALUATE, child=plan, fields=fields)
+        return PhysicalPlan(Op.FILTER_ITERATIVE, child=plan, condition=condition)
+
+    # Scan -> Filter? -> Project
+    if condition:
+        plan = PhysicalPlan(Op.FILTER_ITERATIVE, child=plan, condition=condition)
+    return PhysicalPlan(Op.PROJECT_EVALUATE, child=plan, fields=fields)
@@ -0,0 +1,6 @@
+# The planner modules live at the repository root and import each other by
+# plain module name (see main.py), so the root goes on the import path.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,55 @@
+import orjson
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('flask_cors')
+from app import app  # noqa: E402
+
+CSV = "id,name\n1,Alice\n2,Bob"
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+def stream_lines(response):
+    return [orjson.loads(line) for line in response.data.splitlines()]
+
+@pytest.mark.parametrize('path', ['/run_query', '/run_query/stream'])
+@pytest.mark.parametrize('body, error', [
+    (b'not json', 'Request body must be a JSON object'),
+    (b'[1, 2]', 'Request body must be a JSON object'),
+    (b'{"sql_query": 1, "csv_data": "id\\n1"}', "'sql_query' must be a string"),
+    (b'{"csv_data": "id\\n1"}', 'SQL query is required'),
+    (b'{"sql_query": "SELECT id FROM t1"}', 'CSV data is required'),
+])
+def test_bad_requests_are_json_400s(client, path, body, error):
+    response = client.post(path, data=body, content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': error, 'log': []}
+
+def test_run_query(client):
+    response = client.post('/run_query', json={'sql_query': "SELECT id FROM t1 WHERE name = 'bob'",
+                                               'csv_data': CSV})
+    assert response.status_code == 200
+    assert orjson.loads(response.get_json()['stages']['execute']) == [{'id': 2}]
+
+def test_run_query_error(client):
+    response = client.post('/run_query', json={'sql_query': 'SELECT FROM', 'csv_data': CSV})
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['error'].startswith('Query Error: ')
+    assert body['log'][0]['stage'] == 'error'
+
+def test_stream(client):
+    response = client.post('/run_query/stream', json={'sql_query': 'SELECT name FROM t1',
+                                                      'csv_data': CSV})
+    lines = stream_lines(response)
+    assert [line['stage'] for line in lines] == ['data', 'parse', 'logical', 'optimize',
+                                                 'physical', 'rows', 'execute']
+    assert lines[5]['rows'] == [{'name': 'Alice'}, {'name': 'Bob'}]
+
+def test_stream_error(client):
+    response = client.post('/run_query/stream', json={'sql_query': 'SELECT FROM', 'csv_data': CSV})
+    assert response.status_code == 200  # Errors arrive as the last NDJSON line
+    last = stream_lines(response)[-1]
+    assert last['stage'] == 'error' and last['error'].startswith('Query Error: ')
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from data_source import _parse_with_python, parse_data_to_catalog, table_row_count
+
+pd = pytest.importorskip('pandas')
+from data_source import _parse_with_pandas  # noqa: E402
+
+CSVS = [
+    "id,name,age\n1,Alice,30\n2,Bob,25\n3,,41",
+    "a,b\n1,2.5\n-3,1e3\n4,",
+    "a,b\n1,x\n2,3\n,TRUE",
+    "a,b\n9223372036854775808,1\n-1,2",
+    "a,b,c\n1,2\n3,4,5\n6,7,8,9\n\n10,11,12",
+    " A , B \n 1 , x \n 2 , y ",
+    "a,a\n1,x\n2,y",
+    "a,b,\n1,2,\n3,4,",
+    "a,b\ninf,nan\n1,2",
+]
+
+def _same(left, right):
+    return left.dtype == right.dtype and [None if v != v else v for v in left.tolist()] == \
+        [None if v != v else v for v in right.tolist()]
+
+@pytest.mark.parametrize('csv_data', CSVS)
+def test_pandas_parser_matches_python_parser(csv_data):
+    from_pandas, from_python = _parse_with_pandas(csv_data), _parse_with_python(csv_data)
+    assert list(from_pandas) == list(from_python)
+    for name in from_python:
+        assert _same(from_pandas[name], from_python[name]), name
+
+def test_catalog_helpers_do_not_shadow_user_columns():
+    rows = '\n'.join(f"{'xy'[i % 2]},{i % 3}" for i in range(20))
+    table = parse_data_to_catalog(f"a,a__dict\n{rows}", 't1')['t1']
+    assert list(table.columns) == ['a', 'a__dict']
+    assert 'a' in table.dictionaries and 'a' in table.lowered
+    assert table_row_count(table) == 20
+    assert all(not column.flags.writeable for column in table.columns.values())
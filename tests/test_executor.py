@@ -0,0 +1,60 @@
+import operator
+
+import pytest
+
+from data_source import parse_data_to_catalog
+from executor import execute
+from executor_jit import JIT_MIN_ROWS
+from logical_plan import parse_sql
+from planner import build_physical
+
+def run(sql, csv_data):
+    return execute(build_physical(parse_sql(sql)), parse_data_to_catalog(csv_data, 't1'))
+
+def ids(sql, csv_data):
+    return [record['id'] for record in run(sql, csv_data)]
+
+EXTREMES = "id\n9223372036854775807\n-1\n0\n-9223372036854775808\n5"
+
+@pytest.mark.parametrize('where, expected', [
+    ("id = 9223372036854775807", [9223372036854775807]),
+    ("id = 0", [0]),
+    ("id < 1", [-1, 0, -9223372036854775808]),
+    ("id = 99999999999999999999", []),
+    ("id != 99999999999999999999", [9223372036854775807, -1, 0, -9223372036854775808, 5]),
+    ("id > -99999999999999999999", [9223372036854775807, -1, 0, -9223372036854775808, 5]),
+    ("id = 'x'", []),
+])
+def test_numeric_filters(where, expected):
+    assert ids(f"SELECT id FROM t1 WHERE {where}", EXTREMES) == expected
+
+COMPARE = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+           '=': operator.eq, '!=': operator.ne}
+
+@pytest.mark.parametrize('op', list(COMPARE))
+@pytest.mark.parametrize('value', [7, 7.5, 10 ** 30, -10 ** 30])
+def test_large_numeric_filters(op, value):
+    # Tables this large take the compiled (or threaded NumPy) filter path
+    values = range(-JIT_MIN_ROWS, JIT_MIN_ROWS)
+    csv_data = 'id\n' + '\n'.join(map(str, values))
+    expected = [v for v in values if COMPARE[op](v, value)]
+    assert ids(f"SELECT id FROM t1 WHERE id {op} {value}", csv_data) == expected
+
+def test_filters_skip_empty_cells():
+    csv_data = "id,age,name\n1,30,Ann\n2,,Bob\n3,40,"
+    assert ids("SELECT id FROM t1 WHERE age != 35", csv_data) == [1, 3]
+    assert ids("SELECT id FROM t1 WHERE name != 'ann'", csv_data) == [2]
+
+@pytest.mark.parametrize('rows', [6, 40])  # 40 rows dictionary-encode the name column
+def test_string_filters_are_case_insensitive(rows):
+    names = ['Alice', 'BOB', 'bob']
+    csv_data = 'id,name\n' + '\n'.join(f"{i},{names[i % 3]}" for i in range(rows))
+    assert ids("SELECT id FROM t1 WHERE name = 'Bob' LIMIT 2", csv_data) == [1, 2]
+    assert ids("SELECT id FROM t1 WHERE name <> 'bob' LIMIT 2", csv_data) == [0, 3]
+    assert ids("SELECT id FROM t1 WHERE name < 'b'", csv_data) == []
+    assert run("SELECT name FROM t1 LIMIT 3", csv_data) == [{'name': n} for n in names]
+
+def test_mixed_column_compares_per_value():
+    csv_data = "id,v\n1,10\n2,abc\n3,2.5\n4,"
+    assert ids("SELECT id FROM t1 WHERE v > 2", csv_data) == [1, 3]
+    assert ids("SELECT id FROM t1 WHERE v = 'ABC'", csv_data) == [2]
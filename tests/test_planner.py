@@ -0,0 +1,22 @@
+import pytest
+
+from logical_plan import generate_logical_plan, parse_sql
+from optimizer import optimize
+from physical_plan import generate_physical_plan
+from planner import build_physical
+
+QUERIES = [
+    "SELECT id FROM t1",
+    "SELECT id, name FROM t1 WHERE id < 6",
+    "SELECT id, name, age + 100 FROM t1 WHERE id < 6 LIMIT 3",
+    "SELECT name FROM t1 WHERE id >= 2",
+    "SELECT id, id, name FROM t1 WHERE name = 'Bob'",
+    "SELECT age * 2, age / 0 FROM t1 LIMIT 0",
+    "SELECT id FROM t1 WHERE age != 30 LIMIT 10",
+]
+
+@pytest.mark.parametrize('sql', QUERIES)
+def test_build_physical_matches_staged_planning(sql):
+    statement = parse_sql(sql)
+    staged = generate_physical_plan(optimize(generate_logical_plan(statement))['plan'])
+    assert build_physical(statement).format_tree() == staged.format_tree()
@@ -0,0 +1,7 @@
+# ============================================================================
+# wsgi.py - WSGI Entry Point for Production Servers
+# ============================================================================
+# Usage:  gunicorn -c gunicorn.conf.py wsgi:app
+#         waitress-serve --threads=8 wsgi:app   (Windows)
+
+from app import app